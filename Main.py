@@ -1,17 +1,18 @@
 #!/usr/bin/env python3
 import os
 import sys
-import argparse
-from pathlib import Path
 
-# Añadir src al path
-src_dir = Path(__file__).parent / "src"
-sys.path.insert(0, str(src_dir))
+# Añadir src al path. Los módulos de cada comando se importan al ejecutarlo
+# para que el arranque (help, --quiet, consultas rápidas) sea inmediato.
+src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src")
+sys.path.insert(0, src_dir)
 
-try:
-    from src.OptifineExecuting import execute_optifine
-except ImportError:
-    execute_optifine = None
+def load_executor():
+    try:
+        from OptifineExecuting import execute_optifine
+        return execute_optifine
+    except ImportError:
+        return None
 
 def show_banner():
     print("""
@@ -32,18 +33,37 @@ def show_banner():
         ╚════════════════════════════════════════════════════════════════════════════════════════╝
         """)
 
-def run_downloader(min_version="1.7.10", no_previews=False, threads=15):
-    print("🔽 Descargando versiones de OptiFine...\n")
+def download_config(args):
+    # Un solo sitio traduce las opciones de descarga a CONFIG (download, all y watch)
+    from RateLimiter import parse_rate
+    return dict(
+        MIN_VERSION=args.min_version,
+        MAX_THREADS=args.threads,
+        DOWNLOAD_PREVIEWS=not args.no_previews,
+        REQUESTS_PER_SECOND=args.requests_per_second,
+        MAX_BYTES_PER_SECOND=parse_rate(args.max_bandwidth),
+        MAX_RETRIES=args.retries,
+        LOCAL_CACHE_DIR=args.cache_dir,
+        MIRROR_BASE=args.mirror_base,
+        CHANGELOG_ARCHIVE=args.changelog_archive,
+        SEGMENTS=args.segments,
+        SECONDARY_MIRRORS=args.secondary_mirror or [],
+        RACE_SOURCES=args.race
+    )
+
+def run_downloader(args, console=None):
+    if not args.quiet: print("🔽 Descargando versiones de OptiFine...\n")
     try:
         import OptifineDownloader
         OptifineDownloader.set_config(
-            MIN_VERSION=min_version,
-            MAX_THREADS=threads,
-            DOWNLOAD_PREVIEWS=not no_previews,
-            DOWNLOAD_CHANGELOGS=True
+            DOWNLOAD_CHANGELOGS=True,
+            CHECK_DISK_SPACE=not args.ignore_disk_space,
+            PROCESSES=args.processes,
+            MANIFEST_JOURNAL=args.journal,
+            BOUNDED_MEMORY=args.bounded_memory,
+            **download_config(args)
         )
-        OptifineDownloader.main()
-        return True
+        return OptifineDownloader.main(console, quiet=args.quiet)
     except ImportError as e:
         print(f"\n❌ No se pudo importar OptifineDownloader: {e}")
         return False
@@ -52,12 +72,38 @@ def run_downloader(min_version="1.7.10", no_previews=False, threads=15):
         import traceback; traceback.print_exc()
         return False
 
-def run_generate_manifest():
-    print("📄 Generando manifiesto de versiones...\n")
+def run_watch(args, console=None):
+    if not args.quiet: print("👀 Vigilando optifine.net en busca de versiones nuevas...\n")
+    try:
+        import signal
+        import OptifineDownloader
+        import WatchDaemon
+        OptifineDownloader.set_config(**download_config(args))
+        watcher = WatchDaemon.Watcher(console or WatchDaemon.WatchConsole(), OptifineDownloader.CONFIG, args.interval, args.prepatch)
+        signal.signal(signal.SIGTERM, lambda signum, frame: watcher.stop())
+        if args.status_port:
+            WatchDaemon.serve_status(watcher, args.host if args.host != '0.0.0.0' else '127.0.0.1', args.status_port)
+            print(f"📡 Estado en http://127.0.0.1:{args.status_port}/status")
+        print(f"📄 Estado en {watcher.status_path} (cada {args.interval:g} s)")
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            watcher.stop()
+            watcher.set_status(state='stopped')
+        return True
+    except ImportError as e:
+        print(f"\n❌ No se pudo importar WatchDaemon: {e}")
+        return False
+
+def run_generate_manifest(console=None, quiet=False):
+    if not quiet: print("📄 Generando manifiesto de versiones...\n")
     try:
         import GenerateManifest
         if hasattr(GenerateManifest, 'main'):
-            GenerateManifest.main()
+            manifest = GenerateManifest.main()
+            if console is not None:
+                console.event('manifest', file=GenerateManifest.OUTPUT_FILENAME, entries=len(manifest or []))
+            if not manifest: return False
         else:
             manifest = GenerateManifest.scrape_optifine_manifest()
             if manifest:
@@ -76,6 +122,149 @@ def run_generate_manifest():
         import traceback; traceback.print_exc()
         return False
 
+def run_mirror_server(base_dir="PyOptifine", host="0.0.0.0", port=8080, quiet=False):
+    if not quiet: print("🌐 Iniciando mirror local...\n")
+    try:
+        import MirrorServer
+        MirrorServer.serve(base_dir, host, port)
+        return True
+    except ImportError as e:
+        print(f"\n❌ No se pudo importar MirrorServer: {e}")
+        return False
+    except Exception as e:
+        print(f"\n❌ Error en el mirror local: {e}")
+        return False
+
+def run_gc(base_dir="PyOptifine", keep_latest=None, preview_max_age=None, dry_run=False, console=None, prune_unreferenced=False, quiet=False):
+    if not quiet: print("🧹 Limpiando el mirror de .jar...\n")
+    try:
+        import GarbageCollector
+        from Preflight import format_bytes
+        try:
+            manifest = GarbageCollector.load_manifest(base_dir)
+        except (OSError, ValueError) as e:
+            # Sin manifiesto todo parecería huérfano: no se borra nada
+            print(f"❌ No se pudo leer el manifiesto en {base_dir}: {e}")
+            if console is not None: console.add_error(f"Manifiesto no disponible: {e}")
+            return False
+        
+        plan, removals = GarbageCollector.plan_gc(base_dir, manifest, keep_latest, preview_max_age, prune_unreferenced=prune_unreferenced)
+        for reason, (count, total) in sorted(GarbageCollector.summarize(plan).items()):
+            print(f"   • {GarbageCollector.REASONS[reason]}: {count} archivos, {format_bytes(total)}")
+        planned = sum(size for _, size, _ in plan)
+        if console is not None:
+            for path, size, reason in plan:
+                console.event('gc', path=path, bytes=size, reason=reason, dry_run=dry_run)
+        
+        if dry_run:
+            print(f"\n🔎 Simulación: se liberarían {format_bytes(planned)} ({len(plan)} archivos)")
+            if console is not None: console.event('gc_summary', files=len(plan), bytes=planned, dry_run=True)
+            return True
+        
+        reclaimed, errors = GarbageCollector.apply_gc(plan)
+        GarbageCollector.update_manifest(base_dir, manifest, removals)
+        for error in errors:
+            print(f"   ❌ {error}")
+            if console is not None: console.add_error(error)
+        print(f"\n✅ Liberados {format_bytes(reclaimed)} ({len(plan) - len(errors)} archivos)")
+        if console is not None: console.event('gc_summary', files=len(plan) - len(errors), bytes=reclaimed, dry_run=False)
+        return not errors
+    except ImportError as e:
+        print(f"\n❌ No se pudo importar GarbageCollector: {e}")
+        return False
+
+def run_check(base_dir="PyOptifine", console=None, quiet=False):
+    if not quiet: print("🔬 Comprobando qué installers se pueden parchear...\n")
+    try:
+        import PatchPrecheck
+        import GarbageCollector
+        try:
+            manifest = GarbageCollector.load_manifest(base_dir)
+        except (OSError, ValueError):
+            manifest = []
+        index = PatchPrecheck.PatchIndex(os.path.join(base_dir, PatchPrecheck.INDEX_NAME))
+        results = PatchPrecheck.scan_directory(index, os.path.join(base_dir, 'Jar'), manifest)
+        index.save()
+        
+        counts = {}
+        for filename, entry in results:
+            counts[entry['strategy']] = counts.get(entry['strategy'], 0) + 1
+            if not entry['patchable']: print(f"   ⚠️ {filename}: {PatchPrecheck.STRATEGIES[entry['strategy']]}")
+            if console is not None: console.event('precheck', filename=filename, strategy=entry['strategy'], patchable=entry['patchable'])
+        for strategy, count in sorted(counts.items()):
+            print(f"   • {PatchPrecheck.STRATEGIES[strategy]}: {count}")
+        patchable = sum(1 for _, entry in results if entry['patchable'])
+        print(f"\n✅ {patchable}/{len(results)} installers parcheables")
+        if console is not None: console.event('precheck_summary', jars=len(results), patchable=patchable)
+        return True
+    except ImportError as e:
+        print(f"\n❌ No se pudo importar PatchPrecheck: {e}")
+        return False
+
+def run_java(console=None, quiet=False):
+    if not quiet: print("☕ Buscando JDKs (JAVA_HOME, PATH, directorios habituales)...\n")
+    try:
+        import JavaToolchain
+        entries = JavaToolchain.report()
+        if console is not None:
+            for entry in entries: console.event('java', home=entry['home'], version=entry['version'], release_8=entry['release_8'], startup=entry['startup'], flags=entry['flags'])
+        toolchain = JavaToolchain.resolve()
+        print(f"\n✅ Se usará {toolchain.describe()}")
+        return True
+    except ImportError as e:
+        print(f"\n❌ No se pudo importar JavaToolchain: {e}")
+        return False
+    except FileNotFoundError as e:
+        print(f"\n❌ {e}")
+        if console is not None: console.add_error(str(e))
+        return False
+
+def run_patch(optifine_jar, minecraft_dirs, java_cmd=None, console=None, tmp_dir=None, base_dir="PyOptifine", library_cache=None):
+    execute_optifine = load_executor()
+    if execute_optifine is None: print("❌ OptifineExecutor no disponible"); return False
+    if isinstance(minecraft_dirs, str): minecraft_dirs = [minecraft_dirs]
+    if not os.path.exists(optifine_jar) and os.path.basename(optifine_jar) == optifine_jar:
+        # Solo un nombre de archivo: se descarga ahora, antes que cualquier otra cosa
+        try:
+            from PyOptifineClient import OptifineClient
+            print(f"🔽 {optifine_jar} no está en local: descargándolo para instalar...")
+            optifine_jar = OptifineClient(base_dir=base_dir).ensure_available(optifine_jar)
+        except Exception as e:
+            print(f"❌ No se pudo obtener {optifine_jar}: {e}")
+            if console is not None: console.add_error(f"{optifine_jar}: {e}")
+            return False
+    kwargs = {}
+    if os.path.isdir(base_dir):
+        # El índice de 'check' evita descompilar installers que se sabe que fallan
+        import PatchPrecheck
+        kwargs['patch_index'] = PatchPrecheck.PatchIndex(os.path.join(base_dir, PatchPrecheck.INDEX_NAME))
+    if library_cache:
+        from LibraryCache import LibraryCache, new_stats, add_stats
+        kwargs['library_cache'] = LibraryCache(library_cache)
+        total = new_stats()
+    if java_cmd: kwargs['java_cmd'] = java_cmd
+    if tmp_dir: kwargs['tmp_root'] = tmp_dir
+    if console is not None:
+        kwargs['on_phase'] = lambda name, seconds: console.event('phase', name=name, seconds=round(seconds, 3))
+        kwargs['installer_stdout'] = sys.stderr
+    success = True
+    for minecraft_dir in minecraft_dirs:
+        try:
+            stats = execute_optifine(optifine_jar, minecraft_dir, **kwargs)
+            print(f"✅ OptiFine instalado en {minecraft_dir}")
+            if stats: add_stats(total, stats)
+            if console is not None: console.event('installed', jar=optifine_jar, mcdir=minecraft_dir, **(stats or {}))
+        except Exception as e:
+            print(f"❌ Error en {minecraft_dir}: {e}")
+            if console is not None: console.add_error(f"{minecraft_dir}: {e}")
+            success = False
+    if library_cache:
+        from Preflight import format_bytes
+        print(f"\n🔗 Caché de librerías: {total['linked']} enlaces, {total['reflinked']} reflinks, {total['copied']} copias")
+        print(f"   Ahorrados {format_bytes(total['bytes_saved'])} de {format_bytes(total['bytes_total'])}")
+        if console is not None: console.event('library_cache', **total)
+    return success
+
 def show_help():
     print("""
 PyOptifine Manager - Gestor completo de descargas OptiFine
@@ -84,13 +273,54 @@ COMANDOS DISPONIBLES:
   download    - Descargar versiones de OptiFine
   manifest    - Generar manifiesto de versiones
   all         - Ejecutar ambos (download + manifest)
-  patch       - Parchear y ejecutar OptiFine installer
+  patch       - Parchear y ejecutar OptiFine installer (alias: install)
+  java        - Listar los JDK encontrados y cuál se usará para parchear
+  check       - Comprobar qué .jar descargados se pueden parchear (índice por hash)
+  watch       - Daemon: sondear optifine.net y descargar solo las versiones nuevas
+  gc          - Borrar del mirror los .jar antiguos, huérfanos o temporales
+  serve       - Servir PyOptifine/ (Jar, Changelogs, manifest) por HTTP a la red local
   help        - Mostrar ayuda
 
 OPCIONES:
+  -q, --quiet            - No mostrar el banner ni los mensajes informativos
+  --output FORMATO       - text (default) o jsonl: un evento JSON por línea en stdout, sin preguntas
+  --profile MODO         - cpu (cProfile) o mem (tracemalloc): perfila el comando y resume por fases
+  --profile-dir RUTA     - Dónde guardar el .prof/.tracemalloc y el resumen .txt (default: .)
+  --record DIR           - Grabar todo el tráfico HTTP (cabeceras, cuerpos, tiempos) en DIR
+  --replay DIR           - Reproducir sin red el tráfico grabado en DIR
+  --replay-speed N       - Velocidad de --replay: 1 = tiempos grabados, 10 = 10x, 0 = sin esperas
+  --jar RUTA             - OptiFine installer (.jar) para 'patch'; un nombre sin ruta se descarga si falta
+  --mcdir RUTA           - Directorio .minecraft para 'patch' (repetible: varias instancias)
+  --library-cache RUTA   - 'patch': caché compartida de librerías; las instancias se enlazan en vez de copiarse
+  --java RUTA            - Ejecutable de Java para 'patch' (default: el JDK detectado que arranca más rápido)
+  --tmp-dir RUTA         - Raíz de los espacios de trabajo de 'patch' (default: /dev/shm o el temporal del sistema)
   --min-version VERSION  - Versión mínima de Minecraft (default: 1.7.10)
   --no-previews          - No descargar versiones preview
   --threads NUMERO       - Máx. hilos de descarga (default: 15)
+  --requests-per-second N - Máx. peticiones por segundo a cada host (default: sin límite)
+  --max-bandwidth VEL    - Ancho de banda total, ej. 500K o 2M bytes/s (default: sin límite)
+  --retries NUMERO       - Reintentos por archivo ante errores temporales (default: 3)
+  --cache-dir RUTA       - Copiar los .jar desde una caché local antes de descargarlos
+  --mirror-base URL      - Descargar primero desde un mirror local (ej. http://host:8080)
+  --segments NUMERO      - Descargar cada .jar en N rangos en paralelo (default: 1)
+  --secondary-mirror URL - Mirror adicional para rangos o carreras (repetible)
+  --processes NUMERO     - Repartir la descarga entre N procesos (los hilos se reparten entre ellos)
+  --journal              - Anotar cada descarga en un diario JSONL: un corte no pierde el progreso
+  --bounded-memory       - Memoria acotada: resultados a disco y solo los últimos mensajes en memoria
+  --race                 - Descargar de dos fuentes a la vez y quedarse con la más rápida
+  --ignore-disk-space    - Descargar aunque el espacio libre previsto no alcance
+  --changelog-archive    - Guardar los changelogs en PyOptifine/Changelogs.zip en vez de archivos sueltos
+  --interval SEGUNDOS    - 'watch': intervalo entre sondeos (default: 600)
+  --status-port PUERTO   - 'watch': servir el estado (cola, latencia) en http://127.0.0.1:PUERTO/status
+  --prepatch             - 'watch': dejar parcheadas las versiones nuevas en PyOptifine/Patched
+  --host HOST            - Interfaz del mirror local para 'serve' (default: 0.0.0.0)
+  --port PUERTO          - Puerto del mirror local para 'serve' (default: 8080)
+  --base-dir RUTA        - Directorio de 'serve', 'gc', 'check' y del índice de 'patch' (default: PyOptifine)
+  --keep-latest N        - 'gc': conservar solo las N versiones más recientes por versión de Minecraft
+  --preview-max-age DÍAS - 'gc': borrar previews publicadas hace más de DÍAS días
+                           (quedan retiradas en el manifiesto: 'download' y 'watch' no las vuelven a bajar)
+  --dry-run              - 'gc': mostrar lo que se borraría sin borrar nada
+  --prune-unreferenced   - 'gc': borrar también los .jar que no están en el último manifiesto
 """)
 
 def show_interactive_menu():
@@ -134,40 +364,128 @@ def configure_and_run(command):
     
     return command, {'min_version': min_version, 'no_previews': no_previews, 'threads': threads}
 
+def run_command(args, console=None):
+    success = True
+    if args.record or args.replay:
+        import HttpFixtures
+        HttpFixtures.configure('record' if args.record else 'replay', args.record or args.replay, args.replay_speed)
+        if not args.quiet: print(f"🎞️  {'Grabando' if args.record else 'Reproduciendo'} tráfico HTTP en {args.record or args.replay}")
+    if args.command in ['download','all']: success = run_downloader(args, console) and success
+    if args.command in ['manifest','all']: success = run_generate_manifest(console, args.quiet) and success
+    if args.command == 'serve': success = run_mirror_server(args.base_dir, args.host, args.port, args.quiet)
+    if args.command == 'watch': success = run_watch(args, console)
+    if args.command == 'check': success = run_check(args.base_dir, console, args.quiet)
+    if args.command == 'java': success = run_java(console, args.quiet)
+    if args.command == 'gc': success = run_gc(args.base_dir, args.keep_latest, args.preview_max_age, args.dry_run, console, args.prune_unreferenced, args.quiet)
+    
+    if args.command in ['patch','install']:
+        optifine_jar, minecraft_dir = args.jar, args.mcdir
+        if not optifine_jar or not minecraft_dir:
+            # Solo se pregunta en modo texto con una terminal interactiva
+            if console is not None or not sys.stdin.isatty():
+                print("❌ Faltan --jar y/o --mcdir")
+                if console is not None: console.add_error("Faltan --jar y/o --mcdir")
+                return False
+            optifine_jar = optifine_jar or input("Ruta al OptiFine installer (.jar): ").strip()
+            minecraft_dir = minecraft_dir or [input("Ruta al directorio .minecraft: ").strip()]
+        success = run_patch(optifine_jar, minecraft_dir, args.java, console, args.tmp_dir, args.base_dir, args.library_cache) and success
+    return success
+
+def run_profiled(args, console=None):
+    if not args.profile: return run_command(args, console)
+    import Profiling
+    profile = Profiling.Profile(args.profile, args.profile_dir, label=args.command)
+    profile.start()
+    try:
+        return run_command(args, console)
+    finally:
+        # En modo jsonl stdout está redirigido a stderr: el resumen no ensucia los eventos
+        print("\n📊 Perfil (" + args.profile + ")\n" + profile.stop())
+        print("💾 Archivos: " + ", ".join(profile.files))
+        if console is not None: console.event('profile', mode=args.profile, files=profile.files, phases=profile.phase_totals(), elapsed=round(profile.elapsed, 3), peak_bytes=profile.peak)
+
 def main():
-    if len(sys.argv) > 1 and sys.argv[1] == 'help': show_help(); return
-    show_banner()
+    if len(sys.argv) > 1 and sys.argv[1] in ('help', '-h', '--help'): show_help(); return
     
+    import argparse
     parser = argparse.ArgumentParser(description='PyOptifine Manager', add_help=False)
-    parser.add_argument('command', nargs='?', choices=['download','manifest','all','patch','help'])
+    parser.add_argument('command', nargs='?', choices=['download','manifest','all','patch','install','serve','gc','check','java','watch','help'])
     parser.add_argument('--min-version', default='1.7.10')
     parser.add_argument('--no-previews', action='store_true')
     parser.add_argument('--threads', type=int, default=15)
+    parser.add_argument('--requests-per-second', type=float, default=0)
+    parser.add_argument('--max-bandwidth', default='0')
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--cache-dir', default=None)
+    parser.add_argument('--mirror-base', default=None)
+    parser.add_argument('--changelog-archive', action='store_true')
+    parser.add_argument('--segments', type=int, default=1)
+    parser.add_argument('--secondary-mirror', action='append', default=[])
+    parser.add_argument('--race', action='store_true')
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--journal', action='store_true')
+    parser.add_argument('--bounded-memory', action='store_true')
+    parser.add_argument('--ignore-disk-space', action='store_true')
+    parser.add_argument('--interval', type=float, default=600)
+    parser.add_argument('--status-port', type=int, default=None)
+    parser.add_argument('--prepatch', action='store_true')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--base-dir', default='PyOptifine')
+    parser.add_argument('--keep-latest', type=int, default=None)
+    parser.add_argument('--preview-max-age', type=int, default=None)
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--prune-unreferenced', action='store_true')
+    parser.add_argument('--jar', default=None)
+    parser.add_argument('--mcdir', action='append', default=[])
+    parser.add_argument('--library-cache', default=None)
+    parser.add_argument('--java', default=None)
+    parser.add_argument('--tmp-dir', default=None)
+    parser.add_argument('--profile', choices=['cpu','mem'], default=None)
+    parser.add_argument('--profile-dir', default='.')
+    parser.add_argument('--record', default=None)
+    parser.add_argument('--replay', default=None)
+    parser.add_argument('--replay-speed', type=float, default=1.0)
+    parser.add_argument('--output', choices=['text','jsonl'], default='text')
+    parser.add_argument('-q','--quiet', action='store_true')
     parser.add_argument('-h','--help', action='store_true')
     args = parser.parse_args()
     
     if args.help: show_help(); return
     
+    if args.output == 'jsonl':
+        # stdout queda reservado para los eventos; cualquier otro print va a stderr
+        import contextlib, time
+        from OptifineDownloader import JsonLinesConsole
+        console = JsonLinesConsole(sys.stdout)
+        if args.command is None or args.command == 'help':
+            console.add_error("Se requiere un comando en modo --output jsonl")
+            sys.exit(2)
+        console.event('start', command=args.command, cwd=os.getcwd())
+        with contextlib.redirect_stdout(sys.stderr):
+            success = run_profiled(args, console)
+        console.event('done', command=args.command, success=success,
+                      elapsed=round(time.time() - console.start_time, 3))
+        if not success: sys.exit(1)
+        return
+    
+    if not args.quiet: show_banner()
+    
     if args.command is None:
         command, config = show_interactive_menu()
         if command is None: return
         if config: args.min_version=config.get('min_version',args.min_version); args.no_previews=config.get('no_previews',args.no_previews); args.threads=config.get('threads',args.threads)
         args.command = command
     
-    print(f"\n📁 Directorio de trabajo: {os.getcwd()}")
-    print(f"\n⚙️ CONFIG: Comando={args.command}, MinVersion={args.min_version}, Previews={'No' if args.no_previews else 'Sí'}, Hilos={args.threads}\n")
-    
-    success = True
-    if args.command in ['download','all']: success = run_downloader(args.min_version,args.no_previews,args.threads) and success
-    if args.command in ['manifest','all']: success = run_generate_manifest() and success
+    if not args.quiet:
+        print(f"\n📁 Directorio de trabajo: {os.getcwd()}")
+        print(f"\n⚙️ CONFIG: Comando={args.command}, MinVersion={args.min_version}, Previews={'No' if args.no_previews else 'Sí'}, Hilos={args.threads}\n")
     
-    if args.command == 'patch':
-        if execute_optifine is None: print("❌ OptifineExecutor no disponible"); return
-        optifine_jar = input("Ruta al OptiFine installer (.jar): ").strip()
-        minecraft_dir = input("Ruta al directorio .minecraft: ").strip()
-        try: execute_optifine(optifine_jar, minecraft_dir); print("✅ OptiFine parcheado y ejecutado con éxito")
-        except Exception as e: print(f"❌ Error: {e}")
+    success = run_profiled(args)
     
+    if args.quiet:
+        if not success: sys.exit(1)
+        return
     print("\n" + "="*60)
     print("✨ ¡Proceso completado!" if success else "⚠️  Proceso con errores")
     print("\n💡 Para más info: python3 Main.py help")
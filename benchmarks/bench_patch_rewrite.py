@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# Compara la reescritura original del installer en dos pasadas (copiar el jar con
+# el Installer.class nuevo y después volver a copiarlo entero para cambiar el
+# Main-Class) con write_patched_jar, que hace las dos cosas en una sola pasada.
+# Uso: python3 benchmarks/bench_patch_rewrite.py [installer.jar] [repeticiones]
+# Sin jar se genera uno sintético del tamaño de un installer (~6 MB, 2500 entradas).
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from OptifinePatcher import write_patched_jar, rewrite_manifest, INSTALLER_CLASS_PATH, MANIFEST_PATH
+
+MAIN_CLASS = "optifine.Installer"
+
+def build_installer_like(path, entries=2500, entry_size=4096):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as jar:
+        jar.writestr(MANIFEST_PATH, "Manifest-Version: 1.0\nMain-Class: Installer\n")
+        jar.writestr(INSTALLER_CLASS_PATH, os.urandom(entry_size))
+        for i in range(entries):
+            # Mitad aleatorio, mitad repetido: comprime como un .class típico
+            payload = os.urandom(entry_size // 2) + bytes(entry_size // 2)
+            jar.writestr(f"net/optifine/gen/Class{i}.class", payload)
+
+def legacy_two_pass(optifine_jar, output_jar, patched_class, main_class):
+    with zipfile.ZipFile(optifine_jar, "r") as jar_in, zipfile.ZipFile(output_jar, "w") as jar_out:
+        for item in jar_in.infolist():
+            if item.filename != INSTALLER_CLASS_PATH:
+                jar_out.writestr(item, jar_in.read(item.filename))
+        jar_out.writestr(INSTALLER_CLASS_PATH, patched_class)
+    temp_jar = output_jar.with_suffix(".temp.jar")
+    with zipfile.ZipFile(output_jar, "r") as jar_in, zipfile.ZipFile(temp_jar, "w") as jar_out:
+        manifest = jar_in.read(MANIFEST_PATH).decode("utf-8")
+        for item in jar_in.infolist():
+            if item.filename != MANIFEST_PATH:
+                jar_out.writestr(item, jar_in.read(item.filename))
+        jar_out.writestr(MANIFEST_PATH, rewrite_manifest(manifest, main_class))
+    temp_jar.replace(output_jar)
+
+def measure(name, func, source, work, patched_class, repeats):
+    total = 0.0
+    for i in range(repeats):
+        target = Path(work) / f"bench_{i}.jar"
+        start = time.perf_counter()
+        func(Path(source), target, patched_class, MAIN_CLASS)
+        total += time.perf_counter() - start
+        with zipfile.ZipFile(target) as jar:
+            assert f"Main-Class: {MAIN_CLASS}".encode() in jar.read(MANIFEST_PATH)
+            assert jar.read(INSTALLER_CLASS_PATH) == patched_class
+        target.unlink()
+    print(f"{name:<32} {total / repeats * 1000:9.2f} ms por jar")
+    return total / repeats
+
+def main():
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    with tempfile.TemporaryDirectory() as work:
+        if len(sys.argv) > 1:
+            source = sys.argv[1]
+        else:
+            source = os.path.join(work, "installer.jar")
+            build_installer_like(source)
+        with zipfile.ZipFile(source) as jar:
+            count = len(jar.infolist())
+        patched_class = os.urandom(8192)
+        print(f"📊 Reescritura del installer: {os.path.getsize(source) / 1048576:.1f} MB, {count} entradas, x{repeats}")
+        legacy = measure("dos pasadas (clase + manifiesto)", legacy_two_pass, source, work, patched_class, repeats)
+        single = measure("write_patched_jar (una pasada)", write_patched_jar, source, work, patched_class, repeats)
+        print(f"⚡ {legacy / single:.1f}x más rápido")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# Mide el arranque en frío de Main.py con `python -X importtime`.
+# Uso: python3 benchmarks/bench_startup.py [--budget-ms 150] [--runs 10] [-- args de Main.py]
+# Sale con código 1 si la mediana supera el presupuesto.
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+MAIN = Path(__file__).resolve().parent.parent / "Main.py"
+
+def parse_importtime(stderr):
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            imports.append((int(cumulative_us), int(self_us), name[1:].rstrip()))
+        except ValueError:
+            continue
+    return imports
+
+def run_once(main_args):
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", str(MAIN), *main_args],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    return (time.perf_counter() - start) * 1000, parse_importtime(proc.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque de Main.py")
+    parser.add_argument("--budget-ms", type=float, default=150.0)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("main_args", nargs="*", default=["help"])
+    args = parser.parse_args()
+
+    walls = []
+    imports = []
+    for _ in range(args.runs):
+        wall, imports = run_once(args.main_args)
+        walls.append(wall)
+
+    median = statistics.median(walls)
+    print(f"🚀 Main.py {' '.join(args.main_args)}: mediana {median:.1f} ms "
+          f"(mín {min(walls):.1f} / máx {max(walls):.1f}, {args.runs} ejecuciones)")
+
+    # Solo los imports de primer nivel, para no contar dos veces los anidados
+    top_level = [item for item in imports if not item[2].startswith(" ")]
+    print(f"\n📦 Imports más costosos (acumulado, última ejecución):")
+    for cumulative, own, name in sorted(top_level, reverse=True)[:args.top]:
+        print(f"   {cumulative / 1000:8.2f} ms  {name.strip()}")
+
+    if median > args.budget_ms:
+        print(f"\n❌ Supera el presupuesto de {args.budget_ms:.0f} ms")
+        sys.exit(1)
+    print(f"\n✅ Dentro del presupuesto de {args.budget_ms:.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# Compara el bucle original de download_file (read(16384) + write) con
+# FastTransfer.stream_to_file (readinto sobre un búfer reutilizado + sha256).
+# Uso: python3 benchmarks/bench_transfer.py [MB] [repeticiones]
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from FastTransfer import stream_to_file, copy_file
+
+class FakeResponse(io.BytesIO):
+    def __init__(self, payload):
+        super().__init__(payload)
+        self.headers = {'Content-Length': str(len(payload))}
+
+def legacy_loop(response, f, digest):
+    file_size = 0
+    while True:
+        chunk = response.read(16384)
+        if not chunk:
+            break
+        f.write(chunk)
+        digest.update(chunk)
+        file_size += len(chunk)
+    return file_size
+
+def fast_path(response, f, digest):
+    return stream_to_file(response, f, digest=digest)
+
+def measure(name, func, payload, path, repeats):
+    wall = cpu = 0.0
+    for _ in range(repeats):
+        response = FakeResponse(payload)
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        with open(path, 'wb') as f:
+            func(response, f, hashlib.sha256())
+        wall += time.perf_counter() - start_wall
+        cpu += time.process_time() - start_cpu
+    mb = len(payload) * repeats / (1024 * 1024)
+    print(f"{name:<22} {mb / wall:9.1f} MB/s   {mb / cpu:9.1f} MB/s por núcleo (CPU)")
+
+def measure_copy(src, dst, repeats):
+    size = os.path.getsize(src)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        copy_file(src, dst)
+    wall = time.perf_counter() - start
+    print(f"{'copy_file (caché)':<22} {size * repeats / (1024 * 1024) / wall:9.1f} MB/s")
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    payload = os.urandom(size_mb * 1024 * 1024)
+    print(f"📊 Transferencia de {size_mb} MB x {repeats}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'out.jar')
+        measure("read(16384) + write", legacy_loop, payload, path, repeats)
+        measure("readinto + memoryview", fast_path, payload, path, repeats)
+        measure_copy(path, os.path.join(tmp, 'copy.jar'), repeats)
+
+if __name__ == "__main__":
+    main()
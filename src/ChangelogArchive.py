@@ -0,0 +1,68 @@
+import json
+import os
+import threading
+import zipfile
+
+from ManifestStore import write_json
+
+class ChangelogArchive:
+    def __init__(self, archive_path, batch_size=50):
+        self.archive_path = archive_path
+        self.index_path = os.path.splitext(archive_path)[0] + '.index.json'
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.index = self.load_index()
+        self.members = self.load_members()
+
+    def load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def load_members(self):
+        if not os.path.exists(self.archive_path):
+            return set()
+        try:
+            with zipfile.ZipFile(self.archive_path, 'r') as archive:
+                return set(archive.namelist())
+        except zipfile.BadZipFile:
+            return set()
+
+    def has(self, name):
+        with self.lock:
+            member = self.index.get(name)
+            return member is not None and (member in self.members or member in self.pending)
+
+    def add(self, names, data):
+        # Un solo miembro por contenido; el índice apunta todos los nombres a él
+        member = names[0]
+        with self.lock:
+            if member not in self.members:
+                self.pending[member] = data
+            for name in names:
+                self.index[name] = member
+            if len(self.pending) >= self.batch_size:
+                self._flush()
+
+    def read(self, name):
+        member = self.index.get(name)
+        if member is None:
+            return None
+        with zipfile.ZipFile(self.archive_path, 'r') as archive:
+            return archive.read(member)
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        if self.pending:
+            with zipfile.ZipFile(self.archive_path, 'a', zipfile.ZIP_DEFLATED) as archive:
+                for member, data in self.pending.items():
+                    archive.writestr(member, data)
+            self.members.update(self.pending)
+            self.pending = {}
+        write_json(self.index_path, self.index)
@@ -0,0 +1,92 @@
+import heapq
+import itertools
+import queue
+import threading
+
+# Menor número = antes. Las instalaciones pedidas por el usuario pasan por delante de todo
+PRIORITY_URGENT = 0
+PRIORITY_NORMAL = 100
+
+def entry_key(entry):
+    return entry.get('mirror_url') or entry.get('filename', 'unknown.jar')
+
+class DownloadQueue:
+    # Cola con prioridad (a igual prioridad, orden de llegada) que además sabe qué
+    # entradas están en curso: quien necesita una puede esperarla en vez de repetirla
+    def __init__(self):
+        self._heap = []
+        self._counter = itertools.count()
+        self._queued = {}
+        self._in_flight = {}
+        self.lock = threading.Lock()
+
+    def put(self, entry, priority=PRIORITY_NORMAL):
+        key = entry_key(entry)
+        with self.lock:
+            current = self._queued.get(key)
+            if current is not None and current[0] <= priority:
+                return
+            self._push(key, entry, priority)
+
+    def _push(self, key, entry, priority):
+        # Las versiones anteriores de la clave quedan en el heap y se descartan al sacarlas
+        item = [priority, next(self._counter), key, entry]
+        self._queued[key] = item
+        heapq.heappush(self._heap, item)
+
+    def bump(self, key, priority=PRIORITY_URGENT):
+        with self.lock:
+            current = self._queued.get(key)
+            if current is None:
+                return False
+            if priority < current[0]:
+                self._push(key, current[3], priority)
+            return True
+
+    def get_nowait(self):
+        with self.lock:
+            while self._heap:
+                item = heapq.heappop(self._heap)
+                if self._queued.get(item[2]) is not item:
+                    continue
+                del self._queued[item[2]]
+                self._in_flight.setdefault(item[2], threading.Event())
+                return item[3]
+        raise queue.Empty
+
+    def claim(self, entry):
+        # Atómico: o alguien ya la está descargando (se devuelve su evento para
+        # esperarla) o se saca de la cola y pasa a ser de quien la pide
+        key = entry_key(entry)
+        with self.lock:
+            event = self._in_flight.get(key)
+            if event is not None:
+                return event, None
+            item = self._queued.pop(key, None)
+            self._in_flight[key] = threading.Event()
+            return self._in_flight[key], item[3] if item is not None else entry
+
+    def find(self, filename):
+        with self.lock:
+            for item in self._queued.values():
+                if item[3].get('filename') == filename:
+                    return item[3]
+        return None
+
+    def in_flight(self, key):
+        with self.lock:
+            return self._in_flight.get(key)
+
+    def finish(self, key):
+        with self.lock:
+            event = self._in_flight.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def empty(self):
+        with self.lock:
+            return not self._queued
+
+    def __len__(self):
+        with self.lock:
+            return len(self._queued)
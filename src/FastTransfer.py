@@ -0,0 +1,94 @@
+import os
+import shutil
+import threading
+
+from RetryScheduler import RetryableError
+
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+_local = threading.local()
+
+def get_buffer(size=DEFAULT_BUFFER_SIZE):
+    # Un búfer por hilo, reutilizado entre trozos y entre archivos
+    buf = getattr(_local, 'buffer', None)
+    if buf is None or len(buf) != size:
+        buf = bytearray(size)
+        _local.buffer = buf
+    return memoryview(buf)
+
+def get_content_length(response):
+    try:
+        value = response.headers.get('Content-Length')
+        return int(value) if value is not None else None
+    except (AttributeError, ValueError):
+        return None
+
+def preallocate(f, size):
+    if not size:
+        return
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(f.fileno(), 0, size)
+            return
+        except OSError:
+            pass
+    f.truncate(size)
+
+def stream_to_file(response, f, buffer_size=DEFAULT_BUFFER_SIZE, digest=None, on_chunk=None):
+    expected = get_content_length(response)
+    preallocate(f, expected)
+
+    view = get_buffer(buffer_size)
+    readinto = getattr(response, 'readinto', None)
+    written = 0
+    while True:
+        if readinto is not None:
+            n = readinto(view)
+            chunk = view[:n]
+        else:
+            data = response.read(buffer_size)
+            n = len(data)
+            chunk = data
+        if not n:
+            break
+        if on_chunk:
+            on_chunk(n)
+        f.write(chunk)
+        if digest is not None:
+            digest.update(chunk)
+        written += n
+
+    if expected is not None and written != expected:
+        f.truncate(written)
+        raise RetryableError(f"Transferencia incompleta: {written}/{expected} bytes")
+    return written
+
+def copy_file(src_path, dst_path):
+    size = os.path.getsize(src_path)
+    with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+        copied = 0
+        # copy_file_range copia dentro del kernel (y permite reflinks en btrfs/xfs)
+        if hasattr(os, 'copy_file_range'):
+            try:
+                while copied < size:
+                    n = os.copy_file_range(src.fileno(), dst.fileno(), size - copied)
+                    if n == 0:
+                        break
+                    copied += n
+            except OSError:
+                pass
+        if copied < size and hasattr(os, 'sendfile'):
+            dst.seek(copied)
+            try:
+                while copied < size:
+                    n = os.sendfile(dst.fileno(), src.fileno(), copied, size - copied)
+                    if n == 0:
+                        break
+                    copied += n
+            except OSError:
+                pass
+        if copied < size:
+            src.seek(copied)
+            dst.seek(copied)
+            shutil.copyfileobj(src, dst, DEFAULT_BUFFER_SIZE)
+    return size
@@ -0,0 +1,128 @@
+import datetime
+import json
+import os
+import re
+
+from ManifestStore import write_manifest
+
+MANIFEST_NAME = 'PyOptifine_Manifest.json'
+PARTIAL_PATTERN = re.compile(r'\.(part\d+|tmp|temp\.jar)$')
+
+REASONS = {
+    'superseded': "Versiones antiguas (fuera de las N más recientes)",
+    'old-preview': "Previews antiguas",
+    'unreferenced': "Archivos que ya no están en el manifiesto",
+    'patch-leftover': "Restos de parcheo (_PATCHED.jar)",
+    'partial': "Descargas incompletas o temporales",
+    'orphan-changelog': "Changelogs sin .jar asociado",
+}
+
+def load_manifest(base_dir):
+    path = os.path.join(base_dir, MANIFEST_NAME)
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def parse_release_date(value):
+    try:
+        return datetime.datetime.strptime(value or '', '%d.%m.%Y').date()
+    except ValueError:
+        return None
+
+def is_preview(entry):
+    return entry.get('is_preview') or entry.get('filename', '').startswith('preview_')
+
+def policy_removals(manifest, keep_latest=None, preview_max_age_days=None, today=None):
+    today = today or datetime.date.today()
+    removals = {}
+
+    if keep_latest is not None:
+        by_version = {}
+        for position, entry in enumerate(manifest):
+            if entry.get('retired'):
+                continue
+            by_version.setdefault(entry.get('minecraft_version', ''), []).append((position, entry))
+        for entries in by_version.values():
+            # Más reciente primero; a igual fecha manda el orden de la página
+            entries.sort(key=lambda item: (parse_release_date(item[1].get('release_date')) or datetime.date.min,
+                                           -item[0]), reverse=True)
+            for _, entry in entries[keep_latest:]:
+                removals[entry.get('filename')] = 'superseded'
+
+    if preview_max_age_days is not None:
+        limit = today - datetime.timedelta(days=preview_max_age_days)
+        for entry in manifest:
+            if entry.get('retired'):
+                continue
+            released = parse_release_date(entry.get('release_date'))
+            if is_preview(entry) and released and released < limit:
+                removals.setdefault(entry.get('filename'), 'old-preview')
+
+    removals.pop(None, None)
+    return removals
+
+def plan_gc(base_dir, manifest, keep_latest=None, preview_max_age_days=None, today=None, prune_unreferenced=False):
+    # El manifiesto solo refleja la última descarga (filtrada por --min-version y
+    # --no-previews): lo que no aparece en él solo se borra si se pide expresamente
+    referenced = {entry.get('filename') for entry in manifest if entry.get('filename')}
+    removals = policy_removals(manifest, keep_latest, preview_max_age_days, today)
+    kept = referenced - set(removals)
+    plan = []
+
+    jar_dir = os.path.join(base_dir, 'Jar')
+    if os.path.isdir(jar_dir):
+        with os.scandir(jar_dir) as it:
+            for item in it:
+                if not item.is_file(follow_symlinks=False):
+                    continue
+                name = item.name
+                if PARTIAL_PATTERN.search(name):
+                    reason = 'partial'
+                elif name.endswith('_PATCHED.jar'):
+                    reason = 'patch-leftover'
+                elif name in removals:
+                    reason = removals[name]
+                elif name not in referenced and prune_unreferenced:
+                    reason = 'unreferenced'
+                else:
+                    kept.add(name)
+                    continue
+                plan.append((item.path, item.stat(follow_symlinks=False).st_size, reason))
+
+    changelog_dir = os.path.join(base_dir, 'Changelogs')
+    if os.path.isdir(changelog_dir):
+        kept_changelogs = {name[:-4] + '.txt' for name in kept if name.endswith('.jar')}
+        with os.scandir(changelog_dir) as it:
+            for item in it:
+                if item.is_file(follow_symlinks=False) and item.name not in kept_changelogs:
+                    plan.append((item.path, item.stat(follow_symlinks=False).st_size, 'orphan-changelog'))
+
+    return plan, removals
+
+def apply_gc(plan):
+    reclaimed = 0
+    errors = []
+    for path, size, _ in plan:
+        try:
+            os.remove(path)
+            reclaimed += size
+        except OSError as e:
+            errors.append(f"{path}: {e}")
+    return reclaimed, errors
+
+def update_manifest(base_dir, manifest, removals):
+    # Las entradas quedan retiradas: 'download' y 'watch' no las vuelven a bajar
+    if not removals:
+        return
+    for entry in manifest:
+        if entry.get('filename') in removals:
+            entry['downloaded'] = False
+            entry['local_path'] = ''
+            entry['retired'] = removals[entry['filename']]
+    write_manifest(os.path.join(base_dir, MANIFEST_NAME), manifest)
+
+def summarize(plan):
+    summary = {}
+    for _, size, reason in plan:
+        count, total = summary.get(reason, (0, 0))
+        summary[reason] = (count + 1, total + size)
+    return summary
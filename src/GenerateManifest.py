@@ -2,15 +2,20 @@
 import urllib.request
 import urllib.error
 import urllib.parse
-import json
 import html.parser
 import re
 import sys
 from pathlib import Path
 
+import HttpFixtures
+import Profiling
+from ManifestStore import write_manifest
+
+OUTPUT_FILENAME = 'optifine_mirror_manifest.json'
+
 def fetch_html(url, timeout=15):
     try:
-        opener = urllib.request.build_opener()
+        opener = HttpFixtures.wrap(urllib.request.build_opener())
         opener.addheaders = [('User-Agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')]
         request = urllib.request.Request(url)
         response = opener.open(request, timeout=timeout)
@@ -261,14 +266,15 @@ def scrape_optifine_manifest():
         return scrape_optifine_manifest_v2()
 
 def main():
-    manifest = scrape_optifine_manifest()
+    with Profiling.phase('scrape'):
+        manifest = scrape_optifine_manifest()
     
     if manifest:
         # Guardar el manifiesto en un archivo JSON
-        output_filename = 'optifine_mirror_manifest.json'
+        output_filename = OUTPUT_FILENAME
         
-        with open(output_filename, 'w', encoding='utf-8') as f:
-            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        # Archivo temporal + fsync + rename: un corte nunca deja el manifiesto a medias
+        write_manifest(output_filename, manifest)
         
         print()
         print("=" * 80)
@@ -309,6 +315,8 @@ def main():
         print("   • Verifica tu conexión a internet")
         print("   • Intenta nuevamente más tarde")
         print("   • Revisa si optifine.net está accesible desde tu navegador")
+    
+    return manifest
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,197 @@
+import hashlib
+import http.client
+import io
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+INDEX_NAME = 'index.jsonl'
+BODIES_DIR = 'bodies'
+MODES = ('record', 'replay')
+
+_settings = None
+
+def configure(mode, path, speed=1.0):
+    # speed: 1 = tiempos grabados, 10 = diez veces más rápido, 0 = sin esperas
+    global _settings
+    if mode not in MODES:
+        raise ValueError(f"Modo de fixtures desconocido: {mode}")
+    _settings = {'mode': mode, 'path': path, 'speed': speed, 'archive': None}
+
+def settings():
+    # Lo necesario para reconfigurar un proceso hijo (spawn no hereda el estado)
+    if _settings is None:
+        return None
+    return {'mode': _settings['mode'], 'path': _settings['path'], 'speed': _settings['speed']}
+
+def wrap(opener):
+    if _settings is None:
+        return opener
+    if _settings['archive'] is None:
+        _settings['archive'] = FixtureArchive(_settings['path'])
+    if _settings['mode'] == 'record':
+        return RecordingOpener(opener, _settings['archive'])
+    return ReplayOpener(_settings['archive'], _settings['speed'])
+
+def request_key(request):
+    return f"{request.get_method()} {request.full_url} {request.get_header('Range') or ''}".strip()
+
+def make_headers(items):
+    headers = http.client.HTTPMessage()
+    for name, value in items:
+        headers[name] = value
+    return headers
+
+class FixtureArchive:
+    def __init__(self, path):
+        self.path = path
+        self.bodies_dir = os.path.join(path, BODIES_DIR)
+        self.index_path = os.path.join(path, INDEX_NAME)
+        self.lock = threading.Lock()
+        self.records = {}
+        self.cursor = {}
+        self.load()
+
+    def load(self):
+        try:
+            f = open(self.index_path, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self.records.setdefault(record['key'], []).append(record)
+
+    def store(self, record, body):
+        sha256 = hashlib.sha256(body).hexdigest()
+        target = os.path.join(self.bodies_dir, sha256)
+        if not os.path.exists(target):
+            os.makedirs(self.bodies_dir, exist_ok=True)
+            temp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(body)
+            os.replace(temp_path, target)
+        record['body'] = sha256
+        # Una línea por write con O_APPEND: seguro con varios hilos o procesos grabando
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        fd = os.open(self.index_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+        with self.lock:
+            self.records.setdefault(record['key'], []).append(record)
+
+    def next_record(self, key):
+        # Las respuestas repetidas (reintentos) se reproducen en el orden grabado;
+        # agotadas, se repite la última
+        with self.lock:
+            records = self.records.get(key)
+            if not records:
+                return None
+            position = self.cursor.get(key, 0)
+            self.cursor[key] = position + 1
+            return records[min(position, len(records) - 1)]
+
+    def body(self, record):
+        with open(os.path.join(self.bodies_dir, record['body']), 'rb') as f:
+            return f.read()
+
+class FixtureResponse(io.BytesIO):
+    def __init__(self, body, record, speed=0):
+        super().__init__(body)
+        self.status = record['status']
+        self.reason = record.get('reason', '')
+        self.url = record['url']
+        self.headers = make_headers(record['headers'])
+        transfer = max(record.get('total', 0) - record.get('ttfb', 0), 0)
+        # Segundos por byte para reproducir la velocidad de transferencia grabada
+        self.delay = transfer / len(body) / speed if speed and body else 0
+
+    def pace(self, n):
+        if self.delay and n:
+            time.sleep(n * self.delay)
+        return n
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.pace(len(data))
+        return data
+
+    def readinto(self, buffer):
+        return self.pace(super().readinto(buffer))
+
+    def info(self):
+        return self.headers
+
+    def getcode(self):
+        return self.status
+
+    def geturl(self):
+        return self.url
+
+class RecordingOpener:
+    def __init__(self, opener, archive):
+        self.opener = opener
+        self.archive = archive
+
+    @property
+    def addheaders(self):
+        return self.opener.addheaders
+
+    @addheaders.setter
+    def addheaders(self, value):
+        self.opener.addheaders = value
+
+    def open(self, request, data=None, timeout=None):
+        if isinstance(request, str):
+            request = urllib.request.Request(request)
+        start = time.perf_counter()
+        try:
+            response = self.opener.open(request, data, timeout) if timeout else self.opener.open(request, data)
+            error = None
+        except urllib.error.HTTPError as e:
+            response, error = e, e
+        ttfb = time.perf_counter() - start
+        body = response.read()
+        record = {
+            'key': request_key(request),
+            'url': response.geturl() if error is None else request.full_url,
+            'status': getattr(response, 'status', None) or response.getcode(),
+            'reason': getattr(response, 'reason', ''),
+            'headers': list(response.headers.items()),
+            'ttfb': round(ttfb, 4),
+            'total': round(time.perf_counter() - start, 4),
+        }
+        self.archive.store(record, body)
+        if error is not None:
+            raise urllib.error.HTTPError(request.full_url, error.code, error.reason,
+                                         make_headers(record['headers']), io.BytesIO(body))
+        return FixtureResponse(body, record)
+
+class ReplayOpener:
+    def __init__(self, archive, speed=1.0):
+        self.archive = archive
+        self.speed = speed
+        self.addheaders = []
+
+    def open(self, request, data=None, timeout=None):
+        if isinstance(request, str):
+            request = urllib.request.Request(request)
+        record = self.archive.next_record(request_key(request))
+        if record is None:
+            raise urllib.error.URLError(f"Sin fixture grabada para {request_key(request)}")
+        if self.speed:
+            time.sleep(record.get('ttfb', 0) / self.speed)
+        body = self.archive.body(record)
+        # urllib lanza HTTPError para todo lo que no sea 2xx (304 incluido)
+        if not 200 <= record['status'] < 300:
+            raise urllib.error.HTTPError(request.full_url, record['status'], record.get('reason', ''),
+                                         make_headers(record['headers']), io.BytesIO(body))
+        return FixtureResponse(body, record, self.speed)
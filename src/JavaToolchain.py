@@ -0,0 +1,251 @@
+import glob
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from ManifestStore import write_json
+
+CACHE_NAME = 'java.json'
+# Subir al cambiar la forma de probar un JDK: invalida la caché
+PROBE_VERSION = 1
+# Arranque más rápido para procesos cortos (CFR, javac, installer): CDS y solo C1
+FAST_FLAGS = ('-Xshare:auto', '-XX:TieredStopAtLevel=1')
+EXE = '.exe' if os.name == 'nt' else ''
+
+COMMON_DIRS = (
+    '/usr/lib/jvm/*',
+    '/usr/java/*',
+    '/usr/local/opt/openjdk*',
+    '/opt/java/*',
+    '/opt/jdk*',
+    '/Library/Java/JavaVirtualMachines/*/Contents/Home',
+    '~/.sdkman/candidates/java/*',
+    '~/.jdks/*',
+    'C:/Program Files/Java/*',
+    'C:/Program Files/Eclipse Adoptium/*',
+)
+
+_lock = threading.Lock()
+_resolved = {}
+
+class JavaNotFound(FileNotFoundError):
+    pass
+
+def default_cache_path():
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(cache_home, 'pyoptifine', CACHE_NAME)
+
+def home_of(java):
+    # bin/java -> JAVA_HOME; los enlaces de /usr/bin/java llevan al JDK real
+    return os.path.dirname(os.path.dirname(os.path.realpath(java)))
+
+def candidate_homes():
+    homes = []
+    java_home = os.environ.get('JAVA_HOME')
+    if java_home:
+        homes.append(java_home)
+    on_path = shutil.which('java')
+    if on_path:
+        homes.append(home_of(on_path))
+    for pattern in COMMON_DIRS:
+        homes.extend(sorted(glob.glob(os.path.expanduser(pattern))))
+    seen = set()
+    result = []
+    for home in homes:
+        home = os.path.realpath(home)
+        if home not in seen and os.path.isfile(os.path.join(home, 'bin', 'java' + EXE)):
+            seen.add(home)
+            result.append(home)
+    return result
+
+def parse_version(output):
+    match = re.search(r'version "([^"]+)"', output)
+    if not match:
+        return 0
+    parts = match.group(1).split('.')
+    # "1.8.0_392" es Java 8; "17.0.9" es Java 17
+    major = parts[1] if parts[0] == '1' and len(parts) > 1 else parts[0]
+    digits = re.match(r'\d+', major)
+    return int(digits.group(0)) if digits else 0
+
+def run_quiet(cmd, timeout=60):
+    return subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          timeout=timeout, text=True, errors='replace')
+
+def supports_release_8(javac):
+    # Compilar de verdad: javac 8 no tiene --release y los JDK muy nuevos pueden quitarlo
+    work = tempfile.mkdtemp(prefix='pyoptifine_javac_')
+    try:
+        source = os.path.join(work, 'Probe.java')
+        with open(source, 'w', encoding='utf-8') as f:
+            f.write('class Probe {}\n')
+        result = run_quiet([javac, '--release', '8', '-d', work, source])
+        return result.returncode == 0 and os.path.exists(os.path.join(work, 'Probe.class'))
+    except (OSError, subprocess.SubprocessError):
+        return False
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+def startup_time(java, flags, runs=3):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = run_quiet([java, *flags, '-version'])
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            return None
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def probe(home):
+    java = os.path.join(home, 'bin', 'java' + EXE)
+    javac = os.path.join(home, 'bin', 'javac' + EXE)
+    stat = os.stat(java)
+    entry = {
+        'home': home,
+        'java': java,
+        'javac': javac if os.path.isfile(javac) else None,
+        'version': 0,
+        'release_8': False,
+        'flags': [],
+        'startup': None,
+        'mtime': stat.st_mtime_ns,
+        'probe_version': PROBE_VERSION,
+    }
+    try:
+        entry['version'] = parse_version(run_quiet([java, '-version']).stdout)
+    except (OSError, subprocess.SubprocessError):
+        return entry
+    if entry['javac']:
+        entry['release_8'] = supports_release_8(javac)
+    # Los flags se prueban: una JVM que no los conozca (OpenJ9...) arranca sin ellos
+    for flags in (list(FAST_FLAGS), []):
+        try:
+            startup = startup_time(java, flags)
+        except (OSError, subprocess.SubprocessError):
+            startup = None
+        if startup is not None:
+            entry['flags'] = flags
+            entry['startup'] = round(startup, 4)
+            break
+    return entry
+
+class Toolchain:
+    def __init__(self, entry):
+        self.home = entry['home']
+        self.java = entry['java']
+        self.javac = entry['javac']
+        self.version = entry['version']
+        self.release_8 = entry['release_8']
+        self.flags = list(entry['flags'])
+        self.startup = entry['startup']
+
+    def java_command(self, *args):
+        return [self.java, *self.flags, *args]
+
+    def javac_command(self, *args):
+        if not self.javac:
+            raise JavaNotFound(f"javac no encontrado en {self.home}")
+        # Los flags de arranque llegan a la JVM de javac con -J
+        return [self.javac, *(f"-J{flag}" for flag in self.flags), *args]
+
+    def describe(self):
+        startup = f"{self.startup * 1000:.0f} ms" if self.startup is not None else "?"
+        return f"Java {self.version} en {self.home} (arranque {startup}{', ' + ' '.join(self.flags) if self.flags else ''})"
+
+class ToolchainCache:
+    def __init__(self, path=None):
+        self.path = path or default_cache_path()
+        self.entries = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.entries = {home: entry for home, entry in data.get('toolchains', {}).items()
+                        if entry.get('probe_version') == PROBE_VERSION}
+
+    def get(self, home):
+        # Un JDK actualizado en el sitio cambia el mtime de bin/java: se vuelve a probar
+        entry = self.entries.get(home)
+        try:
+            mtime = os.stat(os.path.join(home, 'bin', 'java' + EXE)).st_mtime_ns
+        except OSError:
+            return None
+        if entry is None or entry.get('mtime') != mtime:
+            entry = probe(home)
+            self.entries[home] = entry
+            self.dirty = True
+        return entry
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        write_json(self.path, {'toolchains': self.entries, 'updated': time.time()})
+        self.dirty = False
+
+def suitable(entry, require_javac=True):
+    if entry is None or not entry['version'] or entry['startup'] is None:
+        return False
+    return entry['release_8'] if require_javac else True
+
+def discover(cache_path=None):
+    cache = ToolchainCache(cache_path)
+    entries = [entry for entry in (cache.get(home) for home in candidate_homes()) if entry]
+    try:
+        cache.save()
+    except OSError:
+        pass
+    return entries
+
+def resolve(java_cmd=None, require_javac=True, cache_path=None):
+    # Una vez por proceso; en disco queda la prueba de cada JDK para las siguientes
+    key = (java_cmd, require_javac, cache_path)
+    with _lock:
+        if key in _resolved:
+            return _resolved[key]
+        if java_cmd:
+            java = shutil.which(java_cmd) or java_cmd
+            if not os.path.isfile(java):
+                raise JavaNotFound(f"Java no encontrado: {java_cmd}")
+            cache = ToolchainCache(cache_path)
+            entry = cache.get(home_of(java))
+            try:
+                cache.save()
+            except OSError:
+                pass
+            if entry is None or (require_javac and not entry['release_8']):
+                raise JavaNotFound(f"{java_cmd} no tiene un javac que acepte --release 8")
+        else:
+            found = [entry for entry in discover(cache_path) if suitable(entry, require_javac)]
+            if not found:
+                need = "JDK con javac --release 8" if require_javac else "Java"
+                raise JavaNotFound(f"No se encontró un {need} (JAVA_HOME, PATH, {', '.join(COMMON_DIRS[:2])}...)")
+            entry = min(found, key=lambda item: item['startup'])
+        toolchain = Toolchain(entry)
+        _resolved[key] = toolchain
+        return toolchain
+
+def report(cache_path=None, out=None):
+    out = out or sys.stdout
+    entries = discover(cache_path)
+    if not entries:
+        print("❌ No se encontró ningún Java", file=out)
+        return entries
+    for entry in sorted(entries, key=lambda item: (item['startup'] is None, item['startup'] or 0)):
+        mark = "✅" if suitable(entry) else "⚠️"
+        startup = f"{entry['startup'] * 1000:.0f} ms" if entry['startup'] is not None else "no arranca"
+        release = "javac --release 8" if entry['release_8'] else ("javac sin --release 8" if entry['javac'] else "sin javac")
+        print(f"   {mark} Java {entry['version']}: {entry['home']} ({startup}, {release})", file=out)
+    return entries
@@ -0,0 +1,179 @@
+import json
+import os
+
+from FastTransfer import copy_file
+from ManifestStore import write_json
+from MultiSource import file_sha256
+
+# Solo estos subárboles de .minecraft se comparten; launcher_profiles.json es
+# propio de cada instancia y se fusiona aparte
+SHARED_DIRS = ('libraries', 'versions')
+PROFILES_NAME = 'launcher_profiles.json'
+# ioctl FICLONE de Linux: copia por referencia (btrfs, xfs, bcachefs)
+FICLONE = 0x40049409
+
+def snapshot(minecraft_dir):
+    files = {}
+    for subdir in SHARED_DIRS:
+        root = os.path.join(minecraft_dir, subdir)
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                st = os.stat(path)
+                files[os.path.relpath(path, minecraft_dir)] = (st.st_size, st.st_mtime_ns, st.st_ino)
+    return files
+
+def load_profiles(minecraft_dir):
+    try:
+        with open(os.path.join(minecraft_dir, PROFILES_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f).get('profiles', {})
+    except (OSError, ValueError):
+        return {}
+
+def reflink(src, dst):
+    import fcntl
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        try:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        except OSError:
+            d.close()
+            os.remove(dst)
+            raise
+
+def place(src, dst):
+    # Reflink > enlace duro > copia; devuelve el método usado. El reflink va primero:
+    # es copia en escritura y una instancia que reescriba una librería no toca a las demás
+    temp = dst + '.tmp'
+    if os.path.exists(temp):
+        os.remove(temp)
+    try:
+        reflink(src, temp)
+        method = 'reflinked'
+    except (OSError, ImportError):
+        try:
+            os.link(src, temp)
+            method = 'linked'
+        except OSError:
+            copy_file(src, temp)
+            method = 'copied'
+    os.replace(temp, dst)
+    return method
+
+class LibraryCache:
+    def __init__(self, root):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.recipes_dir = os.path.join(root, 'recipes')
+
+    def object_path(self, sha256):
+        return os.path.join(self.objects_dir, sha256[:2], sha256)
+
+    def recipe_path(self, installer_sha):
+        return os.path.join(self.recipes_dir, installer_sha + '.json')
+
+    def load_recipe(self, installer_sha):
+        try:
+            with open(self.recipe_path(installer_sha), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def ingest(self, path):
+        sha256 = file_sha256(path)
+        target = self.object_path(sha256)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            # Sin chmod de solo lectura: con enlace duro el inodo es el mismo que el de
+            # las instancias y un launcher que actualice una librería fallaría con EACCES
+            place(path, target)
+        # La instancia de origen también pasa a apuntar al objeto compartido
+        if not os.path.samefile(target, path):
+            place(target, path)
+        return sha256
+
+    def record(self, installer_sha, minecraft_dir, before, profiles_before):
+        after = snapshot(minecraft_dir)
+        files = []
+        requires = set()
+        for relpath, info in sorted(after.items()):
+            if before.get(relpath) == info:
+                continue
+            path = os.path.join(minecraft_dir, relpath)
+            files.append({'path': relpath.replace(os.sep, '/'), 'sha256': self.ingest(path), 'size': info[0]})
+            if relpath.startswith('versions') and relpath.endswith('.json'):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        inherits = json.load(f).get('inheritsFrom')
+                except (OSError, ValueError):
+                    inherits = None
+                if inherits:
+                    requires.add(inherits)
+
+        profiles = {key: value for key, value in load_profiles(minecraft_dir).items()
+                    if profiles_before.get(key) != value}
+        recipe = {'files': files, 'profiles': profiles, 'requires': sorted(requires)}
+        os.makedirs(self.recipes_dir, exist_ok=True)
+        write_json(self.recipe_path(installer_sha), recipe)
+        return recipe
+
+    def verify(self, recipe):
+        # Con enlace duro el objeto comparte inodo con las instancias: si una lo ha
+        # reescrito ya no coincide con su hash y no debe enlazarse a ninguna más
+        for item in recipe['files']:
+            source = self.object_path(item['sha256'])
+            try:
+                if os.path.getsize(source) != item['size'] or file_sha256(source) != item['sha256']:
+                    os.remove(source)
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def materialize(self, recipe, minecraft_dir):
+        # Mismo requisito que el installer: la versión vanilla debe existir
+        for version in recipe.get('requires', []):
+            if not os.path.exists(os.path.join(minecraft_dir, 'versions', version, version + '.json')):
+                raise FileNotFoundError(f"Minecraft {version} no está instalado en {minecraft_dir}")
+
+        stats = new_stats()
+        for item in recipe['files']:
+            source = self.object_path(item['sha256'])
+            if not os.path.exists(source):
+                raise FileNotFoundError(f"Objeto ausente en la caché de librerías: {item['sha256']}")
+            target = os.path.join(minecraft_dir, *item['path'].split('/'))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            try:
+                if os.path.samefile(source, target):
+                    stats['linked'] += 1
+                    stats['bytes_saved'] += item['size']
+                    stats['bytes_total'] += item['size']
+                    continue
+            except OSError:
+                pass
+            method = place(source, target)
+            stats[method] += 1
+            stats['bytes_total'] += item['size']
+            if method != 'copied':
+                stats['bytes_saved'] += item['size']
+
+        if recipe.get('profiles'):
+            merge_profiles(minecraft_dir, recipe['profiles'])
+        return stats
+
+def merge_profiles(minecraft_dir, profiles):
+    path = os.path.join(minecraft_dir, PROFILES_NAME)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {'profiles': {}, 'selectedProfile': '', 'authenticationDatabase': {}}
+    data.setdefault('profiles', {}).update(profiles)
+    write_json(path, data)
+
+def new_stats():
+    return {'installed': 0, 'linked': 0, 'reflinked': 0, 'copied': 0, 'bytes_saved': 0, 'bytes_total': 0}
+
+def add_stats(total, stats):
+    for key, value in stats.items():
+        total[key] = total.get(key, 0) + value
+    return total
@@ -0,0 +1,140 @@
+import json
+import os
+
+JOURNAL_SUFFIX = '.journal.jsonl'
+
+def fsync_directory(path):
+    # El rename solo es duradero cuando el directorio también llega al disco
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(path or '.', os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def atomic_write(path, write):
+    temp_path = path + '.tmp'
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    fsync_directory(os.path.dirname(path))
+
+def write_json(path, data, indent=2):
+    atomic_write(path, lambda f: json.dump(data, f, indent=indent, ensure_ascii=False))
+
+def write_manifest(path, entries):
+    # Mismo formato que json.dump(indent=2), pero entrada a entrada: acepta un
+    # generador y nunca construye la lista completa en memoria
+    def write(f):
+        f.write('[')
+        first = True
+        for entry in entries:
+            f.write('\n' if first else ',\n')
+            first = False
+            f.write('  ' + json.dumps(entry, indent=2, ensure_ascii=False).replace('\n', '\n  '))
+        f.write('\n]' if not first else ']')
+    atomic_write(path, write)
+
+def journal_path(manifest_path):
+    root, _ = os.path.splitext(manifest_path)
+    return root + JOURNAL_SUFFIX
+
+class ManifestJournal:
+    # Una línea JSON por entrada terminada. O_APPEND + un único write por línea:
+    # varios hilos o procesos pueden añadir a la vez sin mezclar líneas
+    def __init__(self, path, sync=False):
+        self.path = path
+        self.sync = sync
+        self.fd = None
+
+    def append(self, entry):
+        if self.fd is None:
+            self.fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        os.write(self.fd, (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8'))
+        if self.sync:
+            os.fsync(self.fd)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def replay(self):
+        try:
+            f = open(self.path, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Última línea cortada por un fallo: se descarta
+                    continue
+
+    def remove(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def load_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+DOWNLOAD_FIELDS = ('downloaded', 'file_size', 'local_path', 'sha256')
+
+def carry_forward(entries, previous):
+    # Un .jar ya presente se salta y llega sin datos de descarga: se conservan los
+    # del manifiesto anterior (incluido lo recuperado del diario) si el archivo sigue ahí
+    known = {entry['filename']: entry for entry in previous
+             if entry.get('filename') and entry.get('downloaded')}
+    for entry in entries:
+        prior = known.get(entry.get('filename'))
+        if (not entry.get('downloaded') and prior is not None
+                and prior.get('local_path') and os.path.exists(prior['local_path'])):
+            for field in DOWNLOAD_FIELDS:
+                if field in prior:
+                    entry[field] = prior[field]
+    return entries
+
+def mark_retired(entries, previous):
+    # gc borra por política (--keep-latest, --preview-max-age): la página las sigue
+    # listando, así que la marca del manifiesto anterior evita volver a bajarlas
+    retired = {entry['filename']: entry['retired'] for entry in previous
+               if entry.get('filename') and entry.get('retired')}
+    for entry in entries:
+        reason = retired.get(entry.get('filename'))
+        if reason:
+            entry['retired'] = reason
+            entry['downloaded'] = False
+            entry['local_path'] = ''
+    return entries
+
+def recover_journal(manifest_path, journal):
+    # Vuelca al manifiesto lo que una ejecución interrumpida dejó en el diario
+    recovered = {}
+    for entry in journal.replay():
+        if entry.get('filename'):
+            recovered[entry['filename']] = entry
+    count = len(recovered)
+    if not recovered:
+        journal.remove()
+        return 0
+    merged = []
+    for entry in load_manifest(manifest_path):
+        merged.append(recovered.pop(entry.get('filename'), entry))
+    merged.extend(recovered.values())
+    write_manifest(manifest_path, merged)
+    journal.remove()
+    return count
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+import hashlib
+import http.server
+import json
+import os
+import re
+import socketserver
+import sys
+import threading
+import urllib.parse
+
+SERVED_DIRS = ('Jar', 'Changelogs')
+MANIFEST_NAME = 'PyOptifine_Manifest.json'
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+class ETagCache:
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self.lock = threading.Lock()
+        self.known = {}
+        self.computed = {}
+        self.load_manifest()
+
+    def load_manifest(self):
+        path = os.path.join(self.base_dir, MANIFEST_NAME)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self.lock:
+            for entry in manifest:
+                if entry.get('filename') and entry.get('sha256'):
+                    self.known[entry['filename']] = entry['sha256']
+
+    def get(self, path, stat):
+        name = os.path.basename(path)
+        with self.lock:
+            if name in self.known and path.endswith('.jar'):
+                return self.known[name]
+            key = (path, stat.st_mtime_ns, stat.st_size)
+            if key in self.computed:
+                return self.computed[key]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        value = digest.hexdigest()
+        with self.lock:
+            self.computed[key] = value
+        return value
+
+def parse_range(header, size):
+    match = RANGE_PATTERN.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        length = int(end)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+class MirrorRequestHandler(http.server.BaseHTTPRequestHandler):
+    server_version = "PyOptifineMirror/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def resolve_path(self):
+        path = urllib.parse.unquote(urllib.parse.urlparse(self.path).path).lstrip('/')
+        if path == MANIFEST_NAME:
+            return os.path.join(self.server.base_dir, MANIFEST_NAME)
+        parts = path.split('/')
+        if len(parts) != 2 or parts[0] not in SERVED_DIRS:
+            return None
+        name = parts[1]
+        if not name or name in ('.', '..') or os.sep in name:
+            return None
+        return os.path.join(self.server.base_dir, parts[0], name)
+
+    def do_HEAD(self):
+        self.handle_file(send_body=False)
+
+    def do_GET(self):
+        self.handle_file(send_body=True)
+
+    def handle_file(self, send_body):
+        path = self.resolve_path()
+        if not path or not os.path.isfile(path):
+            self.send_error(404, "No encontrado")
+            return
+
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            self.send_error(404, "No encontrado")
+            return
+
+        with f:
+            stat = os.fstat(f.fileno())
+            size = stat.st_size
+            etag = f'"{self.server.etags.get(path, stat)}"'
+
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            start, end = 0, size - 1
+            status = 200
+            range_header = self.headers.get('Range')
+            if range_header and self.headers.get('If-Range', etag) == etag:
+                byte_range = parse_range(range_header, size)
+                if byte_range is False:
+                    self.send_response(416)
+                    self.send_header('Content-Range', f'bytes */{size}')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                if byte_range:
+                    start, end = byte_range
+                    status = 206
+
+            length = max(0, end - start + 1)
+            self.send_response(status)
+            self.send_header('Content-Type', content_type(path))
+            self.send_header('Content-Length', str(length))
+            self.send_header('Accept-Ranges', 'bytes')
+            self.send_header('ETag', etag)
+            if status == 206:
+                self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            self.end_headers()
+
+            if send_body and length:
+                self.send_file(f, start, length)
+
+    def send_file(self, f, offset, count):
+        self.wfile.flush()
+        if hasattr(os, 'sendfile'):
+            try:
+                sock = self.connection.fileno()
+                while count > 0:
+                    sent = os.sendfile(sock, f.fileno(), offset, count)
+                    if sent == 0:
+                        break
+                    offset += sent
+                    count -= sent
+                return
+            except (OSError, AttributeError):
+                if count <= 0:
+                    return
+        f.seek(offset)
+        while count > 0:
+            block = f.read(min(count, 1024 * 1024))
+            if not block:
+                break
+            self.wfile.write(block)
+            count -= len(block)
+
+def content_type(path):
+    if path.endswith('.jar'):
+        return 'application/java-archive'
+    if path.endswith('.json'):
+        return 'application/json; charset=utf-8'
+    return 'text/plain; charset=utf-8'
+
+class MirrorServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def __init__(self, address, base_dir, verbose=False):
+        self.base_dir = os.path.abspath(base_dir)
+        self.etags = ETagCache(self.base_dir)
+        self.verbose = verbose
+        super().__init__(address, MirrorRequestHandler)
+
+def serve(base_dir="PyOptifine", host="0.0.0.0", port=8080, verbose=False):
+    if not os.path.isdir(base_dir):
+        raise FileNotFoundError(f"Directorio del mirror no encontrado: {base_dir}")
+    server = MirrorServer((host, port), base_dir, verbose=verbose)
+    print(f"🌐 Sirviendo {os.path.abspath(base_dir)} en http://{host}:{port}/")
+    print(f"   • /{MANIFEST_NAME}")
+    for name in SERVED_DIRS:
+        print(f"   • /{name}/")
+    print("   (Ctrl+C para detener)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Servidor detenido")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    serve(sys.argv[1] if len(sys.argv) > 1 else "PyOptifine")
@@ -0,0 +1,166 @@
+import hashlib
+import os
+import re
+import threading
+
+from FastTransfer import preallocate, stream_to_file, DEFAULT_BUFFER_SIZE
+from RetryScheduler import RetryableError
+
+CONTENT_RANGE = re.compile(r'bytes\s+0-0/(\d+)')
+SHA256_HEX = re.compile(r'^[0-9a-f]{64}$')
+
+class Cancelled(Exception):
+    pass
+
+def etag_hash(response):
+    etag = (response.headers.get('ETag') or '').strip('"').lower()
+    return etag if SHA256_HEX.match(etag) else None
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(DEFAULT_BUFFER_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def probe(open_source, source):
+    # Range de un byte: revela el tamaño y si el servidor acepta rangos.
+    # Si responde 200 se devuelve la respuesta para aprovecharla entera.
+    response = open_source(source, {'Range': 'bytes=0-0'})
+    if getattr(response, 'status', 200) == 206:
+        match = CONTENT_RANGE.match(response.headers.get('Content-Range', ''))
+        response.read()
+        response.close()
+        if match:
+            return int(match.group(1)), None, etag_hash(response)
+        return None, None, None
+    return None, response, etag_hash(response)
+
+def split_ranges(size, segments):
+    segments = max(1, min(segments, size))
+    step = size // segments
+    ranges = []
+    for i in range(segments):
+        start = i * step
+        end = size - 1 if i == segments - 1 else start + step - 1
+        ranges.append((start, end))
+    return ranges
+
+def fetch_segment(open_source, source, filepath, start, end, buffer_size, on_chunk, cancel):
+    response = open_source(source, {'Range': f'bytes={start}-{end}'})
+    if getattr(response, 'status', 200) != 206:
+        response.close()
+        raise RetryableError("El servidor ignoró la cabecera Range")
+    remaining = end - start + 1
+    view = memoryview(bytearray(min(buffer_size, remaining)))
+    with open(filepath, 'r+b') as f:
+        f.seek(start)
+        while remaining > 0:
+            if cancel.is_set():
+                raise Cancelled()
+            n = response.readinto(view[:min(len(view), remaining)])
+            if not n:
+                raise RetryableError(f"Segmento {start}-{end} incompleto")
+            if on_chunk:
+                on_chunk(n)
+            f.write(view[:n])
+            remaining -= n
+    return etag_hash(response)
+
+def download_segmented(open_source, sources, filepath, segments, buffer_size=DEFAULT_BUFFER_SIZE, on_chunk=None):
+    size, response, expected = probe(open_source, sources[0])
+    if response is not None or not size:
+        # Sin soporte de rangos: descarga en un solo flujo
+        if response is None:
+            response = open_source(sources[0], {})
+        with open(filepath, 'wb') as f:
+            stream_to_file(response, f, buffer_size=buffer_size, on_chunk=on_chunk)
+        return os.path.getsize(filepath), expected
+
+    with open(filepath, 'wb') as f:
+        preallocate(f, size)
+        f.truncate(size)
+
+    cancel = threading.Event()
+    errors = []
+    hashes = set([expected]) if expected else set()
+    lock = threading.Lock()
+
+    def run(index, start, end):
+        # Cada segmento empieza por una fuente distinta y rota si falla
+        for attempt in range(len(sources)):
+            source = sources[(index + attempt) % len(sources)]
+            try:
+                found = fetch_segment(open_source, source, filepath, start, end, buffer_size, on_chunk, cancel)
+                if found:
+                    with lock:
+                        hashes.add(found)
+                return
+            except Cancelled:
+                return
+            except Exception as e:
+                last_error = e
+        with lock:
+            errors.append(last_error)
+        cancel.set()
+
+    threads = []
+    for index, (start, end) in enumerate(split_ranges(size, segments)):
+        t = threading.Thread(target=run, args=(index, start, end), daemon=True)
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join()
+
+    if errors:
+        raise errors[0]
+    if len(hashes) > 1:
+        raise RetryableError("Las fuentes anuncian hashes distintos para el mismo archivo")
+    return size, next(iter(hashes), None)
+
+def race_sources(open_source, sources, filepath, buffer_size=DEFAULT_BUFFER_SIZE, on_chunk=None):
+    # Dos fuentes descargan el archivo completo; la primera en terminar gana
+    # y la otra se cancela en su siguiente lectura.
+    cancel = threading.Event()
+    lock = threading.Lock()
+    result = {}
+    errors = []
+
+    def run(index, source):
+        part = f"{filepath}.part{index}"
+
+        def check(n):
+            if cancel.is_set():
+                raise Cancelled()
+            if on_chunk:
+                on_chunk(n)
+
+        try:
+            response = open_source(source, {})
+            with open(part, 'wb') as f:
+                size = stream_to_file(response, f, buffer_size=buffer_size, on_chunk=check)
+            with lock:
+                if 'part' in result:
+                    raise Cancelled()
+                result.update(part=part, size=size, expected=etag_hash(response), source=source)
+                cancel.set()
+        except Cancelled:
+            if os.path.exists(part):
+                os.remove(part)
+        except Exception as e:
+            if os.path.exists(part):
+                os.remove(part)
+            with lock:
+                errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(i, source), daemon=True)
+               for i, source in enumerate(sources[:2])]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    if 'part' not in result:
+        raise errors[0] if errors else RetryableError("Ninguna fuente completó la descarga")
+    os.replace(result['part'], filepath)
+    return result['size'], result['expected']
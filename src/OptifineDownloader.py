@@ -14,28 +14,70 @@ import html.parser
 import gzip
 import io
 import sys
+import hashlib
+import collections
+import itertools
+import concurrent.futures
+
+from RateLimiter import RateLimiter
+from FastTransfer import stream_to_file, copy_file, get_content_length, DEFAULT_BUFFER_SIZE
+from RetryScheduler import RetryScheduler, RetryableError, FatalError, FailureQueue, is_retryable, backoff_delay
+from ChangelogArchive import ChangelogArchive
+from MultiSource import download_segmented, race_sources, file_sha256
+import HttpFixtures
+import Profiling
+from ManifestStore import ManifestJournal, journal_path, recover_journal, write_manifest, load_manifest, carry_forward, mark_retired
+from Profiling import peak_rss
+from DownloadQueue import DownloadQueue, entry_key, PRIORITY_URGENT, PRIORITY_NORMAL
+from Preflight import SizeCache, estimate_sizes, lpt_order, check_disk_space, format_bytes, DISK_MARGIN
 
 CONFIG = {
     'MIN_VERSION': "1.7.10",
     'MAX_THREADS': 15,
     'BASE_DIR': "PyOptifine",
     'DOWNLOAD_PREVIEWS': True,
-    'DOWNLOAD_CHANGELOGS': True
+    'DOWNLOAD_CHANGELOGS': True,
+    'REQUESTS_PER_SECOND': 0,
+    'MAX_BYTES_PER_SECOND': 0,
+    'MAX_RETRIES': 3,
+    'RETRY_BASE_DELAY': 1.0,
+    'RETRY_MAX_DELAY': 60.0,
+    'RETRY_BUDGET': 100,
+    'FAILURE_QUEUE': True,
+    'BUFFER_SIZE': DEFAULT_BUFFER_SIZE,
+    'LOCAL_CACHE_DIR': None,
+    'MIRROR_BASE': None,
+    'CHANGELOG_THREADS': 4,
+    'CHANGELOG_ARCHIVE': False,
+    'SEGMENTS': 1,
+    'SECONDARY_MIRRORS': [],
+    'RACE_SOURCES': False,
+    'CHECK_DISK_SPACE': True,
+    'PROCESSES': 1,
+    'MANIFEST_JOURNAL': False,
+    'BOUNDED_MEMORY': False,
+    'LOG_LIMIT': 200
 }
 
+RESULTS_NAME = 'PyOptifine_Results.jsonl'
+
 def set_config(**kwargs):
     for key, value in kwargs.items():
         if key.upper() in CONFIG:
             CONFIG[key.upper()] = value
 
-def get_directories():
-    base_dir = CONFIG['BASE_DIR']
+def get_directories(config=None):
+    base_dir = (config or CONFIG)['BASE_DIR']
     jar_dir = os.path.join(base_dir, "Jar")
     changelog_dir = os.path.join(base_dir, "Changelogs")
     return base_dir, jar_dir, changelog_dir
 
-def ensure_directories():
-    base_dir, jar_dir, changelog_dir = get_directories()
+def get_manifest_path(config=None):
+    base_dir, _, _ = get_directories(config)
+    return os.path.join(base_dir, 'PyOptifine_Manifest.json')
+
+def ensure_directories(config=None):
+    base_dir, jar_dir, changelog_dir = get_directories(config)
     os.makedirs(jar_dir, exist_ok=True)
     os.makedirs(changelog_dir, exist_ok=True)
 
@@ -59,18 +101,23 @@ def format_bar(percent, width=40):
     return '█' * filled + '░' * (width - filled)
 
 class SilentConsole:
-    def __init__(self):
+    def __init__(self, limit=None):
         self._last_len = 0
         self.start_time = time.time()
         self.last_update = 0
-        self.messages = []
-        self.errors = []
+        # Con límite solo se guardan los últimos mensajes; los contadores siguen siendo exactos
+        self.messages = collections.deque(maxlen=limit)
+        self.errors = collections.deque(maxlen=limit)
+        self.message_count = 0
+        self.error_count = 0
     
     def add_message(self, message):
         self.messages.append(message)
+        self.message_count += 1
     
     def add_error(self, error):
         self.errors.append(error)
+        self.error_count += 1
     
     def clear(self):
         sys.stdout.write('\r' + ' ' * self._last_len + '\r')
@@ -115,6 +162,8 @@ class SilentConsole:
         if self.messages:
             print("\n" + "=" * 60)
             print("📋 MENSAJES DEL PROCESO:")
+            if self.message_count > len(self.messages):
+                print(f"   ... {self.message_count - len(self.messages)} mensajes anteriores omitidos")
             for msg in self.messages:
                 print(msg)
         
@@ -122,13 +171,46 @@ class SilentConsole:
             print("\n" + "=" * 60)
             print("❌ ERRORES ENCONTRADOS:")
             print("=" * 60)
+            if self.error_count > len(self.errors):
+                print(f"  ... {self.error_count - len(self.errors)} errores anteriores omitidos")
             for error in self.errors:
                 print(f"  • {error}")
 
+class JsonLinesConsole:
+    # Una línea JSON por evento, escrita al momento: no guarda nada en memoria
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.lock = threading.Lock()
+        self.start_time = time.time()
+        self.error_count = 0
+    
+    def event(self, kind, **data):
+        record = {'event': kind, 'time': round(time.time(), 3)}
+        record.update(data)
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self.lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+    
+    def add_message(self, message):
+        self.event('message', message=message)
+    
+    def add_error(self, error):
+        self.error_count += 1
+        self.event('error', message=error)
+    
+    def progress(self, current, total, prefix="", suffix=""):
+        self.event('progress', current=current, total=total,
+                   elapsed=round(time.time() - self.start_time, 3))
+    
+    def print_all_messages(self):
+        pass
+
 class OptiFineParser(html.parser.HTMLParser):
-    def __init__(self, console):
+    def __init__(self, console, config=None):
         super().__init__()
         self.console = console
+        self.config = config if config is not None else CONFIG
         self.manifest = []
         self._current_version = ""
         self._in_table = False
@@ -172,7 +254,7 @@ class OptiFineParser(html.parser.HTMLParser):
         if tag == 'table' and self._in_table:
             self._in_table = False
             if self._current and 'mirror_url' in self._current:
-                if CONFIG['DOWNLOAD_PREVIEWS'] or not self._is_preview:
+                if self.config['DOWNLOAD_PREVIEWS'] or not self._is_preview:
                     self._current['minecraft_version'] = self._current_version
                     self._current['is_preview'] = self._is_preview
                     
@@ -184,10 +266,13 @@ class OptiFineParser(html.parser.HTMLParser):
             self._current = {}
             self._is_preview = False
 
-def fetch_html(url, timeout=15):
+DOWNLOADS_URL = "https://optifine.net/downloads"
+
+def fetch_html(url, timeout=15, opener=None):
     try:
-        opener = urllib.request.build_opener()
-        opener.addheaders = [('User-Agent', 'Mozilla/5.0')]
+        if opener is None:
+            opener = HttpFixtures.wrap(urllib.request.build_opener())
+            opener.addheaders = [('User-Agent', 'Mozilla/5.0')]
         request = urllib.request.Request(url)
         response = opener.open(request, timeout=timeout)
         
@@ -199,19 +284,24 @@ def fetch_html(url, timeout=15):
     except Exception as e:
         return None
 
-def generate_manifest(console):
+def generate_manifest(console, config=None, opener=None):
+    config = config if config is not None else CONFIG
     console.add_message("🔍 Obteniendo lista de versiones...")
     
-    html_content = fetch_html("https://optifine.net/downloads")
-    if not html_content:
-        console.add_error("No se pudo obtener la página de descargas")
-        return []
-    
-    parser = OptiFineParser(console)
+    with Profiling.phase('scrape'):
+        html_content = fetch_html(DOWNLOADS_URL, opener=opener)
+        if not html_content:
+            console.add_error("No se pudo obtener la página de descargas")
+            return []
+        return parse_manifest(html_content, console, config)
+
+def parse_manifest(html_content, console, config=None):
+    config = config if config is not None else CONFIG
+    parser = OptiFineParser(console, config)
     parser.feed(html_content)
     
     filtered = []
-    min_version = CONFIG['MIN_VERSION']
+    min_version = config['MIN_VERSION']
     for entry in parser.manifest:
         if is_version_in_range(entry.get('minecraft_version', ''), min_version):
             filtered.append(entry)
@@ -219,28 +309,60 @@ def generate_manifest(console):
     preview_count = sum(1 for e in filtered if e.get('is_preview', False))
     
     console.add_message(f"✅ Encontradas {len(filtered)} versiones de OptiFine")
-    if not CONFIG['DOWNLOAD_PREVIEWS'] and preview_count:
+    if not config['DOWNLOAD_PREVIEWS'] and preview_count:
         console.add_message(f"📊 (excluyendo {preview_count} versiones preview)")
     
     return filtered
 
 class DownloadManager:
-    def __init__(self, console):
+    def __init__(self, console, config=None, results_path=None):
         self.console = console
+        self.config = config if config is not None else CONFIG
+        self.results_path = results_path or os.path.join(get_directories(self.config)[0], RESULTS_NAME)
         self.cookie_jar = http.cookiejar.CookieJar()
-        self.opener = urllib.request.build_opener(
+        self.opener = HttpFixtures.wrap(urllib.request.build_opener(
             urllib.request.HTTPCookieProcessor(self.cookie_jar)
-        )
+        ))
         self.opener.addheaders = [('User-Agent', 'Mozilla/5.0')]
         
-        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.rate_limiter = RateLimiter(
+            self.config['REQUESTS_PER_SECOND'],
+            self.config['MAX_BYTES_PER_SECOND']
+        )
+        self.journal = None
+        if self.config['MANIFEST_JOURNAL']:
+            self.journal = ManifestJournal(journal_path(get_manifest_path(self.config)))
+        self.reset()
+    
+    def reset(self):
+        # Estado de una ejecución; el opener, las cookies y los límites se conservan
+        self.queue = DownloadQueue()
+        self.active_workers = 0
+        self.last_errors = {}
         self.stats = {
             'total': 0, 'downloaded': 0, 'skipped': 0, 
-            'failed': 0, 'bytes': 0, 'changelogs': 0
+            'failed': 0, 'bytes': 0, 'changelogs': 0, 'retries': 0
         }
-        self.lock = threading.Lock()
         self.results = []
         self.download_details = []
+        self.result_log = None
+        if self.config['BOUNDED_MEMORY']:
+            # Los resultados van a disco según terminan; en memoria solo quedan los contadores
+            self.result_log = ManifestJournal(self.results_path)
+            self.result_log.remove()
+        self.changelog_archive = None
+        self.retry_scheduler = RetryScheduler(
+            max_retries=self.config['MAX_RETRIES'],
+            base_delay=self.config['RETRY_BASE_DELAY'],
+            max_delay=self.config['RETRY_MAX_DELAY'],
+            budget=self.config['RETRY_BUDGET']
+        )
+    
+    def emit(self, kind, **data):
+        event = getattr(self.console, 'event', None)
+        if event is not None:
+            event(kind, **data)
     
     def extract_download_url_from_html(self, html_content, mirror_url):
         try:
@@ -281,153 +403,496 @@ class DownloadManager:
             return None
     
     def get_final_url(self, mirror_url):
-        try:
-            if not mirror_url.startswith('http'):
-                mirror_url = f"https://optifine.net/{mirror_url}"
-            
-            request = urllib.request.Request(mirror_url)
+        if not mirror_url.startswith('http'):
+            mirror_url = f"https://optifine.net/{mirror_url}"
+        
+        request = urllib.request.Request(mirror_url)
+        self.rate_limiter.wait_request(mirror_url)
+        with Profiling.phase('resolve'):
             response = self.opener.open(request, timeout=15)
             html = response.read().decode('utf-8', errors='ignore')
-            
-            download_url = self.extract_download_url_from_html(html, mirror_url)
-            
-            if download_url:
-                return download_url
-            else:
-                self.console.add_error(f"No se encontró URL de descarga en {mirror_url}")
-                return None
-                
-        except Exception as e:
-            self.console.add_error(f"Error obteniendo URL final de {mirror_url}: {str(e)}")
-            return None
+        
+        download_url = self.extract_download_url_from_html(html, mirror_url)
+        if not download_url:
+            # Resultado determinista (versión retirada o página cambiada): reintentar
+            # solo gastaría el presupuesto de reintentos en esperas
+            raise FatalError(f"No se encontró URL de descarga en {mirror_url}")
+        return download_url
     
-    def download_file(self, url, filepath, referer=""):
+    def fetch_to_file(self, request, filepath, digest=None):
+        self.rate_limiter.wait_request(request.full_url)
+        start = time.perf_counter()
+        response = self.opener.open(request, timeout=30)
+        
         try:
-            if os.path.exists(filepath):
-                return True, os.path.getsize(filepath), True
-            
-            request = urllib.request.Request(url)
-            if referer:
-                request.add_header('Referer', referer)
-            
-            response = self.opener.open(request, timeout=30)
-            file_size = 0
-            
             with open(filepath, 'wb') as f:
-                while True:
-                    chunk = response.read(16384)
-                    if not chunk:
-                        break
-                    f.write(chunk)
-                    file_size += len(chunk)
-            
-            return True, file_size, False
-        except Exception as e:
-            self.console.add_error(f"Error descargando {url}: {str(e)}")
-            return False, 0, False
+                file_size = stream_to_file(
+                    response, f,
+                    buffer_size=self.config['BUFFER_SIZE'],
+                    digest=digest,
+                    on_chunk=self.rate_limiter.wait_bytes
+                )
+        except BaseException:
+            # Un archivo parcial se tomaría como descargado en la siguiente ejecución
+            if os.path.exists(filepath):
+                os.remove(filepath)
+            raise
+        
+        elapsed = time.perf_counter() - start
+        Profiling.record('transfer', elapsed)
+        self.emit('transfer', filename=os.path.basename(filepath), url=request.full_url,
+                  bytes=file_size, seconds=round(elapsed, 3))
+        return file_size, response.headers
     
-    def download_changelog(self, entry):
-        if not CONFIG['DOWNLOAD_CHANGELOGS'] or 'changelog_url' not in entry:
-            return False, 0
+    def download_file(self, url, filepath, referer="", digest=None):
+        if os.path.exists(filepath):
+            return True, os.path.getsize(filepath), True
+        
+        request = urllib.request.Request(url)
+        if referer:
+            request.add_header('Referer', referer)
         
-        changelog_url = entry['changelog_url']
-        if not changelog_url.startswith('http'):
-            changelog_url = f"https://optifine.net/{changelog_url}"
+        file_size, _ = self.fetch_to_file(request, filepath, digest)
+        return True, file_size, False
+    
+    def open_source(self, source, headers):
+        url, referer = source
+        request = urllib.request.Request(url, headers=headers)
+        if referer:
+            request.add_header('Referer', referer)
+        self.rate_limiter.wait_request(url)
+        return self.opener.open(request, timeout=30)
+    
+    def download_sources(self, filename, final_url, referer):
+        sources = [(final_url, referer)]
+        for base in self.config['SECONDARY_MIRRORS'] or []:
+            sources.append((f"{base.rstrip('/')}/Jar/{urllib.parse.quote(filename)}", ""))
+        return sources
+    
+    def download_multi_source(self, sources, filepath):
+        if os.path.exists(filepath):
+            return True, os.path.getsize(filepath), True, None
         
-        filename = entry.get('filename', 'unknown.jar').replace('.jar', '.txt')
-        _, _, changelog_dir = get_directories()
-        changelog_path = os.path.join(changelog_dir, filename)
+        start = time.perf_counter()
+        try:
+            if self.config['RACE_SOURCES'] and len(sources) > 1:
+                size, expected = race_sources(self.open_source, sources, filepath,
+                                              self.config['BUFFER_SIZE'], self.rate_limiter.wait_bytes)
+            else:
+                size, expected = download_segmented(self.open_source, sources, filepath,
+                                                    self.config['SEGMENTS'], self.config['BUFFER_SIZE'],
+                                                    self.rate_limiter.wait_bytes)
+            sha256 = file_sha256(filepath)
+            if expected and expected != sha256:
+                raise RetryableError(f"Hash incorrecto tras reensamblar {os.path.basename(filepath)}")
+        except BaseException:
+            if os.path.exists(filepath):
+                os.remove(filepath)
+            raise
         
-        success, size, existed = self.download_file(changelog_url, changelog_path)
-        return success, size
+        elapsed = time.perf_counter() - start
+        Profiling.record('transfer', elapsed)
+        self.emit('transfer', filename=os.path.basename(filepath), url=sources[0][0],
+                  bytes=size, seconds=round(elapsed, 3), sources=len(sources))
+        return True, size, False, sha256
     
-    def worker(self):
-        _, jar_dir, _ = get_directories()
+    def mirror_url_for(self, folder, filename):
+        base = self.config['MIRROR_BASE']
+        if not base:
+            return None
+        return f"{base.rstrip('/')}/{folder}/{urllib.parse.quote(filename)}"
+    
+    def download_from_mirror(self, folder, filename, filepath):
+        url = self.mirror_url_for(folder, filename)
+        if not url or os.path.exists(filepath):
+            return 0, None
         
+        digest = hashlib.sha256()
+        try:
+            file_size, headers = self.fetch_to_file(urllib.request.Request(url), filepath, digest)
+        except urllib.error.HTTPError as e:
+            if e.code != 404:
+                self.console.add_message(f"↩️  Mirror local falló para {filename} ({e.code}), usando optifine.net")
+            return 0, None
+        except Exception as e:
+            self.console.add_message(f"↩️  Mirror local no disponible para {filename} ({e}), usando optifine.net")
+            return 0, None
+        
+        # El ETag del mirror es el sha256 del archivo servido
+        etag = (headers.get('ETag') or '').strip('"')
+        if etag and folder == 'Jar' and etag != digest.hexdigest():
+            os.remove(filepath)
+            self.console.add_error(f"Hash distinto al ETag del mirror local para {filename}, usando optifine.net")
+            return 0, None
+        return file_size, digest.hexdigest()
+    
+    def copy_from_cache(self, filename, filepath):
+        cache_dir = self.config['LOCAL_CACHE_DIR']
+        if not cache_dir or os.path.exists(filepath):
+            return 0
+        cached = os.path.join(cache_dir, filename)
+        if not os.path.isfile(cached):
+            return 0
+        try:
+            with Profiling.phase('transfer'):
+                return copy_file(cached, filepath)
+        except OSError as e:
+            if os.path.exists(filepath):
+                os.remove(filepath)
+            self.console.add_error(f"Error copiando {filename} desde caché: {str(e)}")
+            return 0
+    
+    def fetch_bytes(self, url):
+        self.rate_limiter.wait_request(url)
+        response = self.opener.open(urllib.request.Request(url), timeout=15)
+        data = response.read()
+        self.rate_limiter.wait_bytes(len(data))
+        return data
+    
+    def fetch_changelog(self, url, name):
+        mirror = self.mirror_url_for('Changelogs', name)
+        if mirror:
+            try:
+                return self.fetch_bytes(mirror)
+            except Exception:
+                pass
+        
+        attempt = 0
         while True:
             try:
-                entry = self.queue.get_nowait()
+                return self.fetch_bytes(url)
+            except Exception as e:
+                if not is_retryable(e) or attempt >= self.config['MAX_RETRIES']:
+                    raise
+                time.sleep(backoff_delay(attempt, self.config['RETRY_BASE_DELAY'], self.config['RETRY_MAX_DELAY']))
+                attempt += 1
+    
+    def changelog_jobs(self, manifest):
+        # Varias entradas pueden compartir el mismo changelog: una sola petición por URL
+        jobs = {}
+        for entry in manifest:
+            if 'changelog_url' not in entry:
+                continue
+            url = entry['changelog_url']
+            if not url.startswith('http'):
+                url = f"https://optifine.net/{url}"
+            name = entry.get('filename', 'unknown.jar').replace('.jar', '.txt')
+            names = jobs.setdefault(url, [])
+            if name not in names:
+                names.append(name)
+        return jobs
+    
+    def changelog_worker(self, jobs, archive):
+        _, _, changelog_dir = get_directories(self.config)
+        
+        while True:
+            try:
+                url, names = jobs.get_nowait()
             except queue.Empty:
                 break
             
-            filename = entry.get('filename', 'unknown.jar')
-            jar_path = os.path.join(jar_dir, filename)
-            
             try:
-                mirror_url = entry['mirror_url']
-                if not mirror_url.startswith('http'):
-                    mirror_url = f"https://optifine.net/{mirror_url}"
-                
-                final_url = self.get_final_url(mirror_url)
-                
-                if not final_url:
-                    with self.lock:
-                        self.stats['failed'] += 1
-                        entry['downloaded'] = False
-                        self.results.append(entry)
-                        self.download_details.append({
-                            'filename': filename,
-                            'status': 'failed',
-                            'error': 'No se pudo extraer URL de descarga del mirror'
-                        })
-                    self.queue.task_done()
-                    continue
-                
-                success, jar_size, existed = self.download_file(final_url, jar_path, mirror_url)
-                
-                changelog_success = False
-                changelog_size = 0
-                if CONFIG['DOWNLOAD_CHANGELOGS'] and 'changelog_url' in entry:
-                    changelog_success, changelog_size = self.download_changelog(entry)
+                if archive is not None:
+                    missing = [n for n in names if not archive.has(n)]
+                else:
+                    missing = [n for n in names if not os.path.exists(os.path.join(changelog_dir, n))]
                 
-                with self.lock:
-                    if existed:
-                        self.stats['skipped'] += 1
-                        status = 'skipped'
-                    elif success:
-                        self.stats['downloaded'] += 1
-                        self.stats['bytes'] += jar_size
-                        entry['downloaded'] = True
-                        entry['file_size'] = jar_size
-                        entry['local_path'] = jar_path
-                        status = 'downloaded'
+                if missing:
+                    data = self.fetch_changelog(url, missing[0])
+                    if archive is not None:
+                        archive.add(missing, data)
                     else:
-                        self.stats['failed'] += 1
-                        entry['downloaded'] = False
-                        status = 'failed'
-                    
-                    if changelog_success:
-                        self.stats['changelogs'] += 1
-                    
-                    self.results.append(entry)
-                    
-                    self.download_details.append({
-                        'filename': filename,
-                        'status': status,
-                        'size_mb': jar_size / (1024 * 1024) if jar_size > 0 else 0
-                    })
+                        for name in missing:
+                            with open(os.path.join(changelog_dir, name), 'wb') as f:
+                                f.write(data)
                 
-            except Exception as e:
                 with self.lock:
-                    self.stats['failed'] += 1
-                    entry['downloaded'] = False
-                    self.results.append(entry)
-                    self.download_details.append({
-                        'filename': filename,
-                        'status': 'failed',
-                        'error': str(e)
-                    })
-            finally:
-                self.queue.task_done()
+                    self.stats['changelogs'] += len(names)
+            except Exception as e:
+                self.console.add_error(f"Error descargando {url}: {str(e)}")
+    
+    def start_changelog_stage(self, manifest):
+        if not self.config['DOWNLOAD_CHANGELOGS']:
+            return []
+        
+        jobs = queue.Queue()
+        for item in self.changelog_jobs(manifest).items():
+            jobs.put(item)
+        if jobs.empty():
+            return []
+        
+        if self.config['CHANGELOG_ARCHIVE']:
+            base_dir, _, _ = get_directories(self.config)
+            self.changelog_archive = ChangelogArchive(os.path.join(base_dir, 'Changelogs.zip'))
+        
+        threads = []
+        for i in range(min(self.config['CHANGELOG_THREADS'], jobs.qsize())):
+            t = threading.Thread(target=self.changelog_worker, args=(jobs, self.changelog_archive), daemon=True)
+            t.start()
+            threads.append(t)
+        return threads
+    
+    def enqueue(self, entry, priority=PRIORITY_NORMAL):
+        self.queue.put(entry, priority)
+    
+    def bump(self, entry, priority=PRIORITY_URGENT):
+        return self.queue.bump(entry_key(entry), priority)
+    
+    def ensure_available(self, entry, timeout=None):
+        # Devuelve la ruta del .jar en cuanto exista. Si hay una sincronización en
+        # marcha no se espera a un worker libre: la entrada sale de la cola y se
+        # descarga en este mismo hilo; si ya está en curso, se espera a ese worker
+        _, jar_dir, _ = get_directories(self.config)
+        filename = entry.get('filename', 'unknown.jar')
+        jar_path = os.path.join(jar_dir, filename)
+        key = entry_key(entry)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        # Primero el archivo y luego la cola: un .jar sin nadie escribiéndolo está
+        # completo. La entrada se queda en la cola para que la sincronización la
+        # registre como saltada y siga en el manifiesto
+        if os.path.exists(jar_path) and self.queue.in_flight(key) is None:
+            return jar_path
+        event, owned = self.queue.claim(entry)
+        if owned is not None:
+            self.emit('urgent', filename=filename)
+            self.process_entry(owned)
+        self.drain_retries(event, deadline)
+        if not event.wait(max(0, deadline - time.monotonic()) if deadline is not None else None):
+            raise TimeoutError(f"{filename} no estuvo disponible en {timeout}s")
+        if not os.path.exists(jar_path):
+            raise RuntimeError(f"No se pudo descargar {filename}: {self.last_errors.get(filename, 'error desconocido')}")
+        return jar_path
+    
+    def drain_retries(self, event, deadline=None):
+        # Reintentos programados sin workers que los atiendan: los procesa este hilo
+        while not event.is_set() and not self.active_workers:
+            entry = self.retry_scheduler.wait_next(deadline)
+            if entry is None:
+                return
+            self.process_entry(entry)
+    
+    def next_entry(self):
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            pass
+        # Cola vacía: esperar a que venza el próximo reintento programado
+        entry = self.retry_scheduler.wait_next()
+        if entry is not None:
+            self.queue.put(entry)
+            return self.next_entry()
+        return None
+    
+    def record_result(self, entry, detail):
+        # Llamar con self.lock tomado
+        if self.result_log is None:
+            self.results.append(entry)
+            self.download_details.append(detail)
+            return
+        # La entrada del manifiesto es el único registro: se completa en el sitio
+        entry.setdefault('downloaded', False)
+        entry.setdefault('file_size', 0)
+        entry.setdefault('local_path', '')
+        self.result_log.append({'entry': entry, 'detail': detail})
+    
+    def outcomes(self):
+        # Pares (entrada, detalle) de la ejecución, desde memoria o desde disco
+        if self.result_log is None:
+            return zip(self.results, self.download_details)
+        return ((line['entry'], line['detail']) for line in self.result_log.replay())
+    
+    def discard_results(self):
+        # El archivo de resultados solo sirve para el resumen y la cola de fallos de
+        # esta ejecución: crece con el número de entradas y no se deja en base_dir
+        if self.result_log is not None:
+            self.result_log.remove()
+    
+    def record_failure(self, entry, filename, error):
+        retryable = is_retryable(error)
+        key = entry.get('mirror_url', filename)
+        if retryable and self.retry_scheduler.schedule(key, entry):
+            attempt = self.retry_scheduler.attempts_for(key)
+            with self.lock:
+                self.stats['retries'] += 1
+            self.console.add_message(f"🔁 Reintento {attempt}/{self.config['MAX_RETRIES']} de {filename}: {error}")
+            self.emit('retry', filename=filename, attempt=attempt, error=str(error))
+            return True
+        
+        self.console.add_error(f"Error descargando {filename}: {error}")
+        with self.lock:
+            self.last_errors[filename] = str(error)
+            self.stats['failed'] += 1
+            entry['downloaded'] = False
+            self.record_result(entry, {
+                'filename': filename,
+                'status': 'failed',
+                'error': str(error),
+                'retryable': retryable,
+                'attempts': self.retry_scheduler.attempts_for(key) + 1
+            })
+        self.emit('failed', filename=filename, error=str(error), retryable=retryable)
+        return False
+    
+    def worker(self):
+        with self.lock:
+            self.active_workers += 1
+        try:
+            while True:
+                entry = self.next_entry()
+                if entry is None:
+                    break
+                self.process_entry(entry)
+        finally:
+            with self.lock:
+                self.active_workers -= 1
+    
+    def process_entry(self, entry):
+        _, jar_dir, _ = get_directories(self.config)
+        filename = entry.get('filename', 'unknown.jar')
+        jar_path = os.path.join(jar_dir, filename)
+        
+        try:
+            mirror_url = entry['mirror_url']
+            if not mirror_url.startswith('http'):
+                mirror_url = f"https://optifine.net/{mirror_url}"
+            
+            digest = hashlib.sha256()
+            sha256 = None
+            cached_size = self.copy_from_cache(filename, jar_path)
+            mirror_size = 0
+            if not cached_size:
+                mirror_size, sha256 = self.download_from_mirror('Jar', filename, jar_path)
+            if cached_size or mirror_size:
+                success, jar_size, existed = True, cached_size or mirror_size, False
+            else:
+                final_url = self.get_final_url(mirror_url)
+                self.emit('resolved', filename=filename, url=final_url)
+                sources = self.download_sources(filename, final_url, mirror_url)
+                if self.config['SEGMENTS'] > 1 or (self.config['RACE_SOURCES'] and len(sources) > 1):
+                    success, jar_size, existed, sha256 = self.download_multi_source(sources, jar_path)
+                else:
+                    success, jar_size, existed = self.download_file(final_url, jar_path, mirror_url, digest)
+                    if not existed:
+                        sha256 = digest.hexdigest()
+            
+            with self.lock:
+                if existed:
+                    self.stats['skipped'] += 1
+                    status = 'skipped'
+                else:
+                    self.stats['downloaded'] += 1
+                    self.stats['bytes'] += jar_size
+                    entry['downloaded'] = True
+                    entry['file_size'] = jar_size
+                    entry['local_path'] = jar_path
+                    if sha256:
+                        entry['sha256'] = sha256
+                    status = 'downloaded'
+                    if self.journal is not None:
+                        self.journal.append(entry)
+                
+                self.record_result(entry, {
+                    'filename': filename,
+                    'status': status,
+                    'size_mb': jar_size / (1024 * 1024) if jar_size > 0 else 0
+                })
+            
+            self.emit('finished', filename=filename, status=status,
+                      bytes=jar_size, sha256=sha256 or '')
+            
+        except Exception as e:
+            if self.record_failure(entry, filename, e):
+                # Sigue en curso: quien la espere sigue esperando al reintento
+                return False
+        self.queue.finish(entry_key(entry))
+        return True
+    
+    def head_size(self, url):
+        try:
+            request = urllib.request.Request(url, method='HEAD')
+            self.rate_limiter.wait_request(url)
+            response = self.opener.open(request, timeout=15)
+            return get_content_length(response)
+        except Exception:
+            return None
+    
+    def preflight(self, manifest, size_cache):
+        _, jar_dir, _ = get_directories(self.config)
+        sizes = {}
+        unknown = []
+        for entry in manifest:
+            filename = entry.get('filename', 'unknown.jar')
+            if entry.get('retired') or os.path.exists(os.path.join(jar_dir, filename)):
+                continue
+            if filename in size_cache.sizes:
+                sizes[filename] = size_cache.sizes[filename]
+            else:
+                unknown.append(filename)
+        
+        # Sin resolver el mirror de optifine.net (una página por archivo): HEAD solo
+        # a un mirror que sirva los .jar directamente, el local o el secundario
+        probe_base = self.config['MIRROR_BASE'] or (self.config['SECONDARY_MIRRORS'] or [None])[0]
+        if unknown and probe_base:
+            workers = max(1, min(self.config['MAX_THREADS'], 16))
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+                urls = [f"{probe_base.rstrip('/')}/Jar/{urllib.parse.quote(name)}" for name in unknown]
+                for name, size in zip(unknown, pool.map(self.head_size, urls)):
+                    if size:
+                        sizes[name] = size
+                        size_cache.sizes[name] = size
+        
+        # El resto se estima por versión de Minecraft: la mediana global daría a
+        # todos el mismo tamaño y el orden LPT quedaría en el orden de la página
+        estimated = [name for name in unknown if name not in sizes]
+        pending = set(estimated)
+        sizes.update(estimate_sizes([entry for entry in manifest if entry.get('filename', 'unknown.jar') in pending],
+                                    size_cache.sizes))
+        
+        total = sum(sizes.values())
+        enough, free = check_disk_space(jar_dir, total)
+        eta = total / size_cache.throughput if size_cache.throughput else None
+        report = {
+            'pending': len(sizes), 'total_bytes': total, 'estimated': len(estimated),
+            'free_bytes': free, 'eta_seconds': round(eta, 1) if eta else None
+        }
+        
+        self.console.add_message(
+            f"📐 Previsto: {len(sizes)} archivos, {format_bytes(total)}"
+            + (f" ({len(estimated)} estimados)" if estimated else "")
+            + (f", ETA ~{eta:.0f}s" if eta else "")
+            + f", libre: {format_bytes(free)}"
+        )
+        self.emit('preflight', **report)
+        
+        if not enough and self.config['CHECK_DISK_SPACE']:
+            self.console.add_error(
+                f"Espacio insuficiente en {jar_dir}: se necesitan {format_bytes(total * DISK_MARGIN)}, "
+                f"hay {format_bytes(free)} libres"
+            )
+            return None, report
+        return lpt_order([entry for entry in manifest if not entry.get('retired')], sizes), report
+    
+    def failed_entries(self):
+        failed = []
+        for entry, detail in self.outcomes():
+            if detail['status'] != 'failed':
+                continue
+            pending = {k: v for k, v in entry.items() if k not in ('downloaded', 'file_size', 'local_path')}
+            pending['last_error'] = detail.get('error', '')
+            pending['retryable'] = detail.get('retryable', False)
+            failed.append(pending)
+        return failed
     
     def download_all(self, manifest):
         for entry in manifest:
-            self.queue.put(entry)
+            self.enqueue(entry)
         self.stats['total'] = len(manifest)
         
         self.console.add_message(f"🚀 Iniciando descarga de {len(manifest)} archivos...")
         
-        max_threads = CONFIG['MAX_THREADS']
+        changelog_threads = self.start_changelog_stage(manifest)
+        
+        max_threads = self.config['MAX_THREADS']
         threads = []
         for i in range(min(max_threads, len(manifest))):
             t = threading.Thread(target=self.worker, daemon=True)
@@ -435,24 +900,38 @@ class DownloadManager:
             threads.append(t)
         
         last_progress = 0
-        while any(t.is_alive() for t in threads) or not self.queue.empty():
+        last_changelogs = 0
+        while (any(t.is_alive() for t in threads + changelog_threads)
+               or not self.queue.empty()):
             with self.lock:
                 processed = (self.stats['downloaded'] + 
                            self.stats['failed'] + 
                            self.stats['skipped'])
+                changelogs = self.stats['changelogs']
             
-            if processed != last_progress:
+            if processed != last_progress or changelogs != last_changelogs:
                 self.console.progress(processed, self.stats['total'], 
                                     prefix="📦 Descargas", 
-                                    suffix=f"📄 {self.stats['changelogs']} changelogs")
+                                    suffix=f"📄 {changelogs} changelogs")
                 last_progress = processed
+                last_changelogs = changelogs
             
             time.sleep(0.1)
         
+        if self.changelog_archive is not None:
+            try:
+                self.changelog_archive.flush()
+            except Exception as e:
+                self.console.add_error(f"Error guardando archivo de changelogs: {str(e)}")
+        
         self.console.progress(self.stats['total'], self.stats['total'],
                             prefix="📦 Descargas",
                             suffix=f"📄 {self.stats['changelogs']} changelogs")
         
+        if self.result_log is not None:
+            # Las entradas ya están completadas en el sitio: ni copias ni búsqueda cuadrática
+            return [entry for entry in manifest if 'downloaded' in entry]
+        
         final = []
         for original in manifest:
             for result in self.results:
@@ -463,6 +942,8 @@ class DownloadManager:
                         'file_size': result.get('file_size', 0),
                         'local_path': result.get('local_path', '')
                     })
+                    if 'sha256' in result:
+                        merged['sha256'] = result['sha256']
                     final.append(merged)
                     break
         
@@ -470,7 +951,7 @@ class DownloadManager:
     
     def print_summary(self, console):
         total_mb = self.stats['bytes'] / (1024 * 1024)
-        _, jar_dir, changelog_dir = get_directories()
+        _, jar_dir, changelog_dir = get_directories(self.config)
         
         console.add_message("📊 Resumen de la descarga")
         console.add_message("=" * 60)
@@ -480,66 +961,180 @@ class DownloadManager:
             f"   ✅ Descargados:      {self.stats['downloaded']}",
             f"   ⏭️  Saltados:        {self.stats['skipped']}",
             f"   ❌ Fallidos:         {self.stats['failed']}",
+            f"   🔁 Reintentos:       {self.stats['retries']}",
             f"   📄 Changelogs:       {self.stats['changelogs']}",
             f"   💾 Total datos:      {total_mb:.1f} MB"
         ]
+        if self.rate_limiter.enabled:
+            summary_lines.append(f"   ⏳ Espera por límite: {self.rate_limiter.waited:.1f}s")
+        peak = peak_rss()
+        if peak:
+            summary_lines.append(f"   🧠 Memoria pico:     {format_bytes(peak)}")
         
         for line in summary_lines:
             console.add_message(line)
         
         console.add_message(f"   📂 Jar:             {jar_dir}/")
-        if CONFIG['DOWNLOAD_CHANGELOGS']:
+        if self.changelog_archive is not None:
+            console.add_message(f"   🗜️  Changelogs:      {self.changelog_archive.archive_path}")
+        elif self.config['DOWNLOAD_CHANGELOGS']:
             console.add_message(f"   📂 Changelogs:      {changelog_dir}/")
         
-        failed_downloads = [d for d in self.download_details if d['status'] == 'failed']
-        skipped_downloads = [d for d in self.download_details if d['status'] == 'skipped']
+        # Solo los primeros de cada lista: el total sale de las estadísticas
+        failed_downloads = list(itertools.islice(
+            (d for _, d in self.outcomes() if d['status'] == 'failed'), 10))
+        skipped_downloads = list(itertools.islice(
+            (d for _, d in self.outcomes() if d['status'] == 'skipped'), 5))
         
         if failed_downloads:
             console.add_message("\n❌ DESCARGAS FALLADAS:")
-            for d in failed_downloads[:10]:
+            for d in failed_downloads:
                 error_msg = f" - {d.get('error', 'Error desconocido')}" if 'error' in d else ""
                 console.add_message(f"   • {d['filename']}{error_msg}")
-            if len(failed_downloads) > 10:
-                console.add_message(f"   ... y {len(failed_downloads) - 10} más")
+            if self.stats['failed'] > 10:
+                console.add_message(f"   ... y {self.stats['failed'] - 10} más")
         
         if skipped_downloads:
             console.add_message("\n⏭️  ARCHIVOS EXISTENTES (SALTADOS):")
-            for d in skipped_downloads[:5]:
+            for d in skipped_downloads:
                 console.add_message(f"   • {d['filename']}")
-            if len(skipped_downloads) > 5:
-                console.add_message(f"   ... y {len(skipped_downloads) - 5} más")
+            if self.stats['skipped'] > 5:
+                console.add_message(f"   ... y {self.stats['skipped'] - 5} más")
+
+def get_failure_queue():
+    base_dir, _, _ = get_directories()
+    return FailureQueue(os.path.join(base_dir, 'PyOptifine_FailedQueue.json'))
 
-def main():
+def prioritize_pending(manifest, pending):
+    # Las entradas fallidas de la ejecución anterior se procesan primero
+    if not pending:
+        return manifest
+    by_url = {entry.get('mirror_url'): entry for entry in manifest}
+    first = []
+    seen = set()
+    for item in pending:
+        url = item.get('mirror_url')
+        if not url or url in seen:
+            continue
+        seen.add(url)
+        entry = by_url.get(url)
+        if entry is None:
+            entry = {k: v for k, v in item.items() if k not in ('last_error', 'retryable')}
+        first.append(entry)
+    return first + [entry for entry in manifest if entry.get('mirror_url') not in seen]
+
+def page_order(entries, page):
+    # Las posiciones importan (p. ej. el desempate por fecha de gc): lo que ya no
+    # está en la página queda al final, en su orden
+    position = {entry_key(entry): i for i, entry in enumerate(page)}
+    return sorted(entries, key=lambda entry: position.get(entry_key(entry), len(position)))
+
+def print_config():
     print(f"⚙️  CONFIGURACIÓN INICIAL:")
     print(f"   • Versión mínima: Minecraft {CONFIG['MIN_VERSION']}")
     print(f"   • Incluir previews: {'Sí' if CONFIG['DOWNLOAD_PREVIEWS'] else 'No'}")
     print(f"   • Descargar changelogs: {'Sí' if CONFIG['DOWNLOAD_CHANGELOGS'] else 'No'}")
     print(f"   • Hilos máximos: {CONFIG['MAX_THREADS']}")
+    if CONFIG['PROCESSES'] > 1:
+        print(f"   • Procesos: {CONFIG['PROCESSES']}")
+    if CONFIG['BOUNDED_MEMORY']:
+        print(f"   • Memoria acotada: resultados en disco, últimos {CONFIG['LOG_LIMIT']} mensajes")
+    if CONFIG['REQUESTS_PER_SECOND']:
+        print(f"   • Peticiones por host: {CONFIG['REQUESTS_PER_SECOND']}/s")
+    if CONFIG['MAX_BYTES_PER_SECOND']:
+        print(f"   • Ancho de banda máximo: {CONFIG['MAX_BYTES_PER_SECOND']} B/s")
     print()
+
+def main(console=None, quiet=False):
+    if console is None:
+        if not quiet:
+            print_config()
+        console = SilentConsole(CONFIG['LOG_LIMIT'] if CONFIG['BOUNDED_MEMORY'] else None)
     
     ensure_directories()
-    console = SilentConsole()
     
+    journal = ManifestJournal(journal_path(get_manifest_path()))
+    if os.path.exists(journal.path):
+        # Una ejecución anterior se cortó: lo ya descargado se conserva en el manifiesto
+        try:
+            recovered = recover_journal(get_manifest_path(), journal)
+            if recovered:
+                console.add_message(f"🩹 {recovered} entradas recuperadas del diario de la ejecución anterior")
+        except Exception as e:
+            console.add_error(f"Error recuperando el diario del manifiesto: {str(e)}")
+    
+    failure_queue = get_failure_queue() if CONFIG['FAILURE_QUEUE'] else None
+    pending = failure_queue.load() if failure_queue else []
+    if pending:
+        console.add_message(f"🔁 {len(pending)} descargas pendientes de la ejecución anterior")
+    
+    # Sin la lista completa de la página no se sigue: el manifiesto y la cola de
+    # fallos se reescribirían solo con las pendientes
     manifest = generate_manifest(console)
     if not manifest:
         console.add_error("❌ No se encontraron versiones para descargar.")
         console.print_all_messages()
-        return
+        return False
+    base_dir, _, _ = get_directories()
+    manifest_file = get_manifest_path()
+    previous = load_manifest(manifest_file)
+    page = manifest
+    manifest = mark_retired(prioritize_pending(manifest, pending), previous)
+    retired = [entry for entry in manifest if entry.get('retired')]
+    if retired:
+        console.add_message(f"🗄️  {len(retired)} versiones retiradas por gc: no se descargan")
+    
+    size_cache = SizeCache(os.path.join(base_dir, 'PyOptifine_SizeCache.json'))
+    size_cache.learn_manifest(manifest_file)
     
     downloader = DownloadManager(console)
-    final_manifest = downloader.download_all(manifest)
+    ordered, _ = downloader.preflight(manifest, size_cache)
+    if ordered is None:
+        console.print_all_messages()
+        return False
+    # El orden LPT es solo el de la cola: el manifiesto se guarda en el de la página
+    pending_names = {item.get('filename') for item in pending}
+    first = [e for e in manifest if e.get('filename') in pending_names and not e.get('retired')]
+    manifest = first + [e for e in ordered if e.get('filename') not in pending_names]
     
-    base_dir, _, _ = get_directories()
-    manifest_file = os.path.join(base_dir, 'PyOptifine_Manifest.json')
+    start = time.time()
+    if CONFIG['PROCESSES'] > 1:
+        from ShardedDownload import download_sharded
+        final_manifest = download_sharded(downloader, manifest, CONFIG['PROCESSES'], size_cache.sizes)
+    else:
+        final_manifest = downloader.download_all(manifest)
+    final_manifest = carry_forward(page_order(final_manifest + retired, page), previous)
+    size_cache.update(final_manifest, time.time() - start, downloader.stats['bytes'])
     try:
-        with open(manifest_file, 'w', encoding='utf-8') as f:
-            json.dump(final_manifest, f, indent=2, ensure_ascii=False)
+        size_cache.save()
+    except OSError as e:
+        console.add_error(f"Error guardando caché de tamaños: {str(e)}")
+    
+    if failure_queue:
+        try:
+            failed = downloader.failed_entries()
+            failure_queue.save(failed)
+            if failed:
+                console.add_message(f"🗂️  {len(failed)} descargas fallidas guardadas en: {failure_queue.path}")
+        except Exception as e:
+            console.add_error(f"Error guardando cola de fallos: {str(e)}")
+    
+    try:
+        write_manifest(manifest_file, final_manifest)
         console.add_message(f"💾 Manifest guardado en: {manifest_file}")
+        if downloader.journal is not None:
+            downloader.journal.remove()
     except Exception as e:
         console.add_error(f"Error guardando manifest: {str(e)}")
     
+    if isinstance(console, JsonLinesConsole):
+        console.event('summary', manifest=manifest_file, peak_rss=peak_rss(), **downloader.stats)
+        downloader.discard_results()
+        return True
     downloader.print_summary(console)
+    downloader.discard_results()
     console.print_all_messages()
+    return True
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,7 +1,9 @@
 import subprocess
 from pathlib import Path
-import shutil
 import OptifinePatcher
+import JavaToolchain
+from LibraryCache import snapshot, load_profiles, new_stats
+from MultiSource import file_sha256
 import json
 
 def create_basic_launcher_profiles(minecraft_dir: Path):
@@ -18,46 +20,74 @@ def create_basic_launcher_profiles(minecraft_dir: Path):
     profiles_file.write_text(json.dumps(basic_data, indent=2), encoding="utf-8")
     print(f"[INFO] launcher_profiles.json creado en {profiles_file}")
 
-def execute_optifine(optifine_jar_path: str, minecraft_dir_path: str, java_cmd: str = "/usr/lib/jvm/java-latest-openjdk/bin/java"):
+def execute_optifine(optifine_jar_path: str, minecraft_dir_path: str, java_cmd: str | None = None, on_phase=None, installer_stdout=None, tmp_root: str | None = None, patch_index=None, library_cache=None):
     base_dir = Path(__file__).parent.resolve()
     optifine_jar = Path(optifine_jar_path).expanduser().resolve()
     minecraft_dir = Path(minecraft_dir_path).expanduser().resolve()
     cfr_jar = (base_dir / "libraries" / "cfr-0.152.jar").resolve()
     if not optifine_jar.exists():
         raise FileNotFoundError(f"OptiFine jar no encontrado: {optifine_jar}")
+    # Antes que nada: el índice dice si merece la pena intentarlo
+    if patch_index is not None:
+        entry = patch_index.check(optifine_jar)
+        if not entry['patchable']:
+            patch_index.save()
+            raise OptifinePatcher.UnpatchableInstaller(f"Installer no parcheable ({entry['strategy']}), se omite: {optifine_jar.name}")
+
+    # Con una receta en la caché de librerías no hace falta Java: solo enlaces
+    installer_sha = None
+    if library_cache is not None:
+        installer_sha = patch_index.jar_hash(optifine_jar) if patch_index is not None else file_sha256(optifine_jar)
+        recipe = library_cache.load_recipe(installer_sha)
+        # Un objeto modificado invalida la receta: se ejecuta el installer y se vuelve a grabar
+        if recipe is not None and library_cache.verify(recipe):
+            minecraft_dir.mkdir(parents=True, exist_ok=True)
+            with OptifinePatcher.phase("install", on_phase):
+                return library_cache.materialize(recipe, minecraft_dir)
+
     if not cfr_jar.exists():
         raise FileNotFoundError(f"cfr.jar no encontrado: {cfr_jar}")
-    if not Path(java_cmd).exists():
-        raise FileNotFoundError(f"Java no encontrado: {java_cmd}")
+    # Sin --java se usa el JDK más rápido de los detectados (resultado cacheado en disco)
+    toolchain = JavaToolchain.resolve(java_cmd)
 
     minecraft_dir.mkdir(parents=True, exist_ok=True)
     create_basic_launcher_profiles(minecraft_dir)
 
-    patched_jar = optifine_jar.parent / f"{optifine_jar.stem}_PATCHED.jar"
-    work_dir = Path(".optifine_patch_work")
-
-    if patched_jar.exists():
-        patched_jar.unlink()
-    if work_dir.exists():
-        shutil.rmtree(work_dir)
-
-    OptifinePatcher.patch_optifine_installer(
-        optifine_jar=optifine_jar,
-        output_jar=patched_jar,
-        cfr_jar=cfr_jar,
-        workdir=work_dir
-    )
-
-    OptifinePatcher.patch_manifest(
-        jar_path=patched_jar,
-        new_main_class="optifine.Installer"
-    )
-
-    if not patched_jar.exists():
-        raise RuntimeError("No se generó el OptiFine parcheado")
-    cmd = [java_cmd, "-jar", str(patched_jar), "--mcdir", str(minecraft_dir)]
-    subprocess.run(cmd, check=True)
-    if work_dir.exists():
-        shutil.rmtree(work_dir)
-    if patched_jar.exists():
-        patched_jar.unlink()
+    # Espacio de trabajo único por instalación (tmpfs si existe): varias
+    # instalaciones en paralelo no se pisan y todo se borra aunque falle
+    with OptifinePatcher.workspace(tmp_root) as work_dir:
+        patched_jar = work_dir / f"{optifine_jar.stem}_PATCHED.jar"
+
+        try:
+            OptifinePatcher.patch_optifine_installer(
+                optifine_jar=optifine_jar,
+                output_jar=patched_jar,
+                cfr_jar=cfr_jar,
+                workdir=work_dir / "patch",
+                on_phase=on_phase,
+                main_class="optifine.Installer",
+                toolchain=toolchain
+            )
+        except OptifinePatcher.UnpatchableInstaller:
+            if patch_index is not None:
+                patch_index.mark_failed(optifine_jar)
+            raise
+        finally:
+            if patch_index is not None:
+                patch_index.save()
+
+        if not patched_jar.exists():
+            raise RuntimeError("No se generó el OptiFine parcheado")
+        if installer_sha is not None:
+            before = snapshot(minecraft_dir)
+            profiles_before = load_profiles(minecraft_dir)
+        cmd = toolchain.java_command("-jar", str(patched_jar), "--mcdir", str(minecraft_dir))
+        with OptifinePatcher.phase("install", on_phase):
+            subprocess.run(cmd, check=True, stdout=installer_stdout)
+
+    if installer_sha is not None:
+        recipe = library_cache.record(installer_sha, minecraft_dir, before, profiles_before)
+        stats = new_stats()
+        stats['installed'] = len(recipe['files'])
+        stats['bytes_total'] = sum(item['size'] for item in recipe['files'])
+        return stats
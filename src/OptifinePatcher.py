@@ -2,39 +2,64 @@ import subprocess
 import zipfile
 import shutil
 import re
+import os
+import tempfile
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
-def patch_optifine_installer( optifine_jar: Path, output_jar: Path, cfr_jar: Path, workdir: Path | None = None ):
-    optifine_jar = optifine_jar.resolve()
-    output_jar = output_jar.resolve()
-    cfr_jar = cfr_jar.resolve()
-
-    work = workdir or Path(".optifine_patch_work")
-    src = work / "src"
-    bin = work / "bin"
-    installer_class_path = "optifine/Installer.class"
-
-    if work.exists():
-        shutil.rmtree(work)
-    src.mkdir(parents=True)
-    bin.mkdir(parents=True)
-
-    with zipfile.ZipFile(optifine_jar, "r") as jar:
-        jar.extract(installer_class_path, work)
-    installer_class = work / installer_class_path
-
-    subprocess.run(
-        ["java", "-jar", str(cfr_jar), str(installer_class),
-         "--outputdir", str(src), "--silent", "true"],
-        check=True
-    )
-
-    installer_java = src / "optifine" / "Installer.java"
-    if not installer_java.exists():
-        raise RuntimeError("CFR no generó Installer.java")
-
-    code = installer_java.read_text(encoding="utf-8")
-
+import JavaToolchain
+import Profiling
+from PatchPrecheck import classify_class, PATCHABLE, STRATEGIES, UnpatchableInstaller
+
+INSTALLER_CLASS_PATH = "optifine/Installer.class"
+MANIFEST_PATH = "META-INF/MANIFEST.MF"
+
+@contextmanager
+def phase(name, on_phase=None):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        Profiling.record(name, seconds)
+        if on_phase:
+            on_phase(name, seconds)
+
+def default_tmp_root():
+    # PYOPTIFINE_TMPDIR > /dev/shm (tmpfs) > directorio temporal del sistema
+    configured = os.environ.get("PYOPTIFINE_TMPDIR")
+    if configured:
+        return configured
+    shm = "/dev/shm"
+    if os.path.isdir(shm) and os.access(shm, os.W_OK | os.X_OK):
+        return shm
+    return tempfile.gettempdir()
+
+@contextmanager
+def workspace(tmp_root: str | None = None, prefix: str = "pyoptifine_"):
+    root = tmp_root or default_tmp_root()
+    os.makedirs(root, exist_ok=True)
+    work = Path(tempfile.mkdtemp(prefix=prefix, dir=root))
+    try:
+        yield work
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+def rewrite_manifest(manifest: str, new_main_class: str) -> str:
+    out = []
+    replaced = False
+    for line in manifest.splitlines():
+        if line.startswith("Main-Class:"):
+            out.append(f"Main-Class: {new_main_class}")
+            replaced = True
+        else:
+            out.append(line)
+    if not replaced:
+        out.append(f"Main-Class: {new_main_class}")
+    return "\n".join(out).strip() + "\n"
+
+def patch_installer_source(code: str) -> str:
     if not re.search(r'^\s*package\s+optifine\s*;', code, re.MULTILINE):
         m = re.match(r'(\s*(/\*.*?\*/\s*)*)', code, re.DOTALL)
         insert_at = m.end() if m else 0
@@ -43,7 +68,7 @@ def patch_optifine_installer( optifine_jar: Path, output_jar: Path, cfr_jar: Pat
     pattern = re.compile(r'File\s+(\w+)\s*=\s*Utils\.getWorkingDirectory\s*\(\s*\)\s*;', re.MULTILINE)
     match = pattern.search(code)
     if not match:
-        raise RuntimeError("No se encontró Utils.getWorkingDirectory()")
+        raise UnpatchableInstaller("No se encontró Utils.getWorkingDirectory()")
     var = match.group(1)
 
     replacement = f"""File {var} = null;
@@ -57,56 +82,106 @@ def patch_optifine_installer( optifine_jar: Path, output_jar: Path, cfr_jar: Pat
         }}
     """
     
-    code = pattern.sub(replacement, code, count=1)
-    installer_java.write_text(code, encoding="utf-8")
-
-    subprocess.run(
-        ["javac", "--release", "8", "-classpath", str(optifine_jar), "-d", str(bin), str(installer_java)],
-        check=True
-    )
-    patched_class = bin / "optifine" / "Installer.class"
-    if not patched_class.exists():
-        raise RuntimeError("Falló la recompilación del Installer.class")
-
-    with zipfile.ZipFile(optifine_jar, "r") as jar_in, zipfile.ZipFile(output_jar, "w") as jar_out:
-        for item in jar_in.infolist():
-            if item.filename == installer_class_path:
-                continue
-            jar_out.writestr(item, jar_in.read(item.filename))
-        jar_out.write(patched_class, installer_class_path)
+    return pattern.sub(replacement, code, count=1)
+
+def patch_optifine_installer( optifine_jar: Path, output_jar: Path, cfr_jar: Path, workdir: Path | None = None, on_phase=None, main_class: str | None = None, tmp_root: str | None = None, toolchain=None ):
+    optifine_jar = Path(optifine_jar).resolve()
+    output_jar = Path(output_jar).resolve()
+    cfr_jar = Path(cfr_jar).resolve()
+
+    if workdir is not None:
+        work = Path(workdir)
+        if work.exists():
+            shutil.rmtree(work)
+        work.mkdir(parents=True)
+        try:
+            _patch_in(work, optifine_jar, output_jar, cfr_jar, on_phase, main_class, toolchain)
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+        return
 
-    shutil.rmtree(work)
+    with workspace(tmp_root) as work:
+        _patch_in(work, optifine_jar, output_jar, cfr_jar, on_phase, main_class, toolchain)
 
-def patch_manifest(jar_path: Path, new_main_class: str):
-    jar_path = jar_path.resolve()
-    manifest_path = "META-INF/MANIFEST.MF"
+def _patch_in(work: Path, optifine_jar: Path, output_jar: Path, cfr_jar: Path, on_phase, main_class, toolchain=None):
+    src = work / "src"
+    bin = work / "bin"
+    src.mkdir()
+    bin.mkdir()
+
+    # CFR y javac necesitan archivos; todo lo demás se hace con buffers en memoria
+    with phase("patch-extract", on_phase):
+        with zipfile.ZipFile(optifine_jar, "r") as jar:
+            installer_bytes = jar.read(INSTALLER_CLASS_PATH)
+
+    # El constant pool dice de antemano si hay algo que parchear
+    strategy = classify_class(installer_bytes)
+    if strategy == "already-patched":
+        with phase("jar-rewrite", on_phase):
+            write_patched_jar(optifine_jar, output_jar, installer_bytes, main_class)
+        return
+    if strategy not in PATCHABLE:
+        raise UnpatchableInstaller(f"Installer no parcheable: {STRATEGIES[strategy]}")
+
+    # CFR y javac salen del mismo JDK que el installer, no del PATH
+    toolchain = toolchain or JavaToolchain.resolve()
+    installer_class = work / "Installer.class"
+    installer_class.write_bytes(installer_bytes)
+
+    with phase("patch-decompile", on_phase):
+        subprocess.run(
+            toolchain.java_command("-jar", str(cfr_jar), str(installer_class),
+                                   "--outputdir", str(src), "--silent", "true"),
+            check=True
+        )
 
-    with zipfile.ZipFile(jar_path, "r") as jar:
-        try:
-            manifest = jar.read(manifest_path).decode("utf-8")
-        except KeyError:
-            manifest = "Manifest-Version: 1.0\n"
-
-        lines = manifest.splitlines()
-        out = []
-        replaced = False
-        for line in lines:
-            if line.startswith("Main-Class:"):
-                out.append(f"Main-Class: {new_main_class}")
-                replaced = True
-            else:
-                out.append(line)
-        if not replaced:
-            out.append(f"Main-Class: {new_main_class}")
+    installer_java = src / "optifine" / "Installer.java"
+    if not installer_java.exists():
+        raise RuntimeError("CFR no generó Installer.java")
 
-        new_manifest = "\n".join(out).strip() + "\n"
+    code = installer_java.read_text(encoding="utf-8")
+    installer_java.write_text(patch_installer_source(code), encoding="utf-8")
 
-    temp_jar = jar_path.with_suffix(".temp.jar")
-    with zipfile.ZipFile(jar_path, "r") as jar_in, zipfile.ZipFile(temp_jar, "w") as jar_out:
-        for item in jar_in.infolist():
-            if item.filename == manifest_path:
-                continue
+    with phase("patch-compile", on_phase):
+        subprocess.run(
+            toolchain.javac_command("--release", "8", "-classpath", str(optifine_jar), "-d", str(bin), str(installer_java)),
+            check=True
+        )
+    patched_class = bin / "optifine" / "Installer.class"
+    if not patched_class.exists():
+        raise RuntimeError("Falló la recompilación del Installer.class")
+    patched_bytes = patched_class.read_bytes()
+
+    with phase("jar-rewrite", on_phase):
+        write_patched_jar(optifine_jar, output_jar, patched_bytes, main_class)
+
+def write_patched_jar(optifine_jar: Path, output_jar: Path, patched_class: bytes, main_class: str | None = None):
+    # Una sola pasada: Installer.class y, si se pide, el Main-Class del manifiesto
+    temp_jar = output_jar.with_name(output_jar.name + ".tmp")
+    try:
+        with zipfile.ZipFile(optifine_jar, "r") as jar_in, zipfile.ZipFile(temp_jar, "w") as jar_out:
+            try:
+                manifest = jar_in.read(MANIFEST_PATH).decode("utf-8")
+            except KeyError:
+                manifest = None
+            if main_class:
+                manifest = rewrite_manifest(manifest or "Manifest-Version: 1.0\n", main_class)
+            copy_manifest_first(jar_in, jar_out, manifest, skip=(INSTALLER_CLASS_PATH,))
+            jar_out.writestr(INSTALLER_CLASS_PATH, patched_class)
+        temp_jar.replace(output_jar)
+    finally:
+        if temp_jar.exists():
+            temp_jar.unlink()
+
+def copy_manifest_first(jar_in: zipfile.ZipFile, jar_out: zipfile.ZipFile, manifest: str, skip=()):
+    # JarInputStream solo reconoce el manifiesto si es la primera entrada (o la
+    # segunda, tras META-INF/): se escribe antes que el resto del contenido
+    items = [item for item in jar_in.infolist() if item.filename != MANIFEST_PATH and item.filename not in skip]
+    meta_dir = [item for item in items if item.filename == "META-INF/"]
+    for item in meta_dir:
+        jar_out.writestr(item, jar_in.read(item.filename))
+    if manifest is not None:
+        jar_out.writestr(MANIFEST_PATH, manifest)
+    for item in items:
+        if item.filename != "META-INF/":
             jar_out.writestr(item, jar_in.read(item.filename))
-        jar_out.writestr(manifest_path, new_manifest)
-
-    temp_jar.replace(jar_path)
@@ -0,0 +1,178 @@
+import json
+import os
+import struct
+import time
+import zipfile
+
+from ManifestStore import write_json
+from MultiSource import file_sha256
+
+INDEX_NAME = 'PyOptifine_PatchIndex.json'
+INSTALLER_CLASS_PATH = 'optifine/Installer.class'
+# Subir al cambiar la lógica del análisis: invalida las entradas anteriores
+SCAN_VERSION = 1
+
+TARGET_METHOD = 'getWorkingDirectory'
+TARGET_DESCRIPTOR = '()Ljava/io/File;'
+MCDIR_FLAG = '--mcdir'
+
+STRATEGIES = {
+    'patch-mcdir': "Parcheable (se inyecta --mcdir)",
+    'already-patched': "Ya acepta --mcdir (solo se cambia el Main-Class)",
+    'no-working-dir': "Sin Utils.getWorkingDirectory()",
+    'no-installer': "Sin optifine/Installer.class",
+    'invalid': "Jar o clase ilegible",
+}
+PATCHABLE = {'patch-mcdir', 'already-patched'}
+
+class UnpatchableInstaller(RuntimeError):
+    pass
+
+# Tamaño de cada entrada del constant pool, salvo Utf8 (longitud variable)
+CP_SIZES = {3: 4, 4: 4, 5: 8, 6: 8, 7: 2, 8: 2, 9: 4, 10: 4, 11: 4, 12: 4,
+            15: 3, 16: 2, 17: 4, 18: 4, 19: 2, 20: 2}
+
+def read_constant_pool(data):
+    if data[:4] != b'\xca\xfe\xba\xbe':
+        raise ValueError("No es un archivo .class")
+    count = struct.unpack_from('>H', data, 8)[0]
+    pool = [None] * count
+    offset = 10
+    index = 1
+    while index < count:
+        tag = data[offset]
+        if tag == 1:
+            length = struct.unpack_from('>H', data, offset + 1)[0]
+            pool[index] = (1, data[offset + 3:offset + 3 + length].decode('utf-8', errors='replace'))
+            offset += 3 + length
+        elif tag in CP_SIZES:
+            size = CP_SIZES[tag]
+            body = data[offset + 1:offset + 1 + size]
+            if len(body) < size:
+                raise ValueError("Constant pool truncado")
+            pool[index] = (tag, struct.unpack('>HH', body) if size == 4 and tag not in (3, 4) else body)
+            offset += 1 + size
+            # Long y Double ocupan dos posiciones
+            if tag in (5, 6):
+                index += 1
+        else:
+            raise ValueError(f"Tag de constant pool desconocido: {tag}")
+        index += 1
+    return pool
+
+def classify_class(data):
+    pool = read_constant_pool(data)
+
+    def utf8(i):
+        item = pool[i] if 0 < i < len(pool) else None
+        return item[1] if item and item[0] == 1 else ''
+
+    strings = {utf8(struct.unpack('>H', item[1])[0]) for item in pool if item and item[0] == 8}
+    if MCDIR_FLAG in strings:
+        return 'already-patched'
+
+    for item in pool:
+        if not item or item[0] != 10:
+            continue
+        class_index, name_type_index = item[1]
+        owner = pool[class_index]
+        name_type = pool[name_type_index]
+        if not owner or owner[0] != 7 or not name_type or name_type[0] != 12:
+            continue
+        owner_name = utf8(struct.unpack('>H', owner[1])[0])
+        name, descriptor = utf8(name_type[1][0]), utf8(name_type[1][1])
+        if (owner_name.rsplit('/', 1)[-1] == 'Utils' and name == TARGET_METHOD
+                and descriptor == TARGET_DESCRIPTOR):
+            return 'patch-mcdir'
+    return 'no-working-dir'
+
+def scan_jar(jar_path):
+    # ZipFile solo lee el directorio central; de los datos se lee únicamente Installer.class
+    try:
+        with zipfile.ZipFile(jar_path, 'r') as jar:
+            try:
+                data = jar.read(INSTALLER_CLASS_PATH)
+            except KeyError:
+                return 'no-installer'
+        return classify_class(data)
+    except (OSError, zipfile.BadZipFile, ValueError, IndexError, struct.error):
+        return 'invalid'
+
+class PatchIndex:
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.files = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.entries = {sha: entry for sha, entry in data.get('entries', {}).items()
+                        if entry.get('scan_version') == SCAN_VERSION}
+        self.files = data.get('files', {})
+
+    def jar_hash(self, jar_path, sha256=None):
+        # Tamaño + mtime evitan volver a hashear un jar que no ha cambiado
+        stat = os.stat(jar_path)
+        key = os.path.abspath(jar_path)
+        known = self.files.get(key)
+        if sha256 is None and known and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return known[2]
+        sha256 = sha256 or file_sha256(jar_path)
+        if known != [stat.st_size, stat.st_mtime_ns, sha256]:
+            self.files[key] = [stat.st_size, stat.st_mtime_ns, sha256]
+            self.dirty = True
+        return sha256
+
+    def check(self, jar_path, sha256=None):
+        sha256 = self.jar_hash(jar_path, sha256)
+        entry = self.entries.get(sha256)
+        if entry is None:
+            strategy = scan_jar(jar_path)
+            entry = self.record(sha256, strategy, os.path.basename(jar_path))
+        return entry
+
+    def record(self, sha256, strategy, filename=''):
+        entry = {
+            'filename': filename,
+            'strategy': strategy,
+            'patchable': strategy in PATCHABLE,
+            'scan_version': SCAN_VERSION,
+            'checked': time.time(),
+        }
+        self.entries[sha256] = entry
+        self.dirty = True
+        return entry
+
+    def mark_failed(self, jar_path, strategy='no-working-dir'):
+        # El análisis es necesario pero no suficiente: si el parcheo falla igualmente
+        # se anota para no volver a pagar CFR + javac con el mismo jar
+        sha256 = self.jar_hash(jar_path)
+        return self.record(sha256, strategy, os.path.basename(jar_path))
+
+    def save(self):
+        if not self.dirty:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        write_json(self.path, {'entries': self.entries, 'files': self.files})
+        self.dirty = False
+
+def scan_directory(index, jar_dir, manifest=None):
+    known = {entry['filename']: entry.get('sha256') for entry in manifest or [] if entry.get('filename')}
+    results = []
+    if not os.path.isdir(jar_dir):
+        return results
+    with os.scandir(jar_dir) as it:
+        for item in sorted(it, key=lambda item: item.name):
+            if not item.is_file() or not item.name.endswith('.jar') or item.name.endswith('_PATCHED.jar'):
+                continue
+            entry = index.check(item.path, known.get(item.name) or None)
+            results.append((item.name, entry))
+    return results
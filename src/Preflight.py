@@ -0,0 +1,104 @@
+import json
+import os
+import re
+import shutil
+import statistics
+import time
+
+from ManifestStore import write_json
+
+# Tamaño típico de un instalador de OptiFine, usado si no hay ningún dato previo
+DEFAULT_JAR_SIZE = 6 * 1024 * 1024
+DISK_MARGIN = 1.05
+# Tamaño aproximado del installer (MB) por versión menor de Minecraft: crece con
+# cada versión, así que sin datos el orden LPT sigue siendo "más nuevo primero"
+VERSION_SIZES_MB = {7: 1.6, 8: 2.0, 9: 2.1, 10: 2.2, 11: 2.3, 12: 2.5, 13: 2.9, 14: 3.3,
+                    15: 3.6, 16: 4.3, 17: 5.0, 18: 5.6, 19: 6.0, 20: 6.6, 21: 7.0}
+MINOR_PATTERN = re.compile(r'(?<![\d.])1\.(\d+)')
+
+class SizeCache:
+    def __init__(self, path):
+        self.path = path
+        self.sizes = {}
+        self.throughput = 0.0
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.sizes = data.get('sizes', {})
+        self.throughput = data.get('throughput', 0.0)
+
+    def learn_manifest(self, manifest_path):
+        # Los tamaños del manifiesto de ejecuciones anteriores también sirven
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return
+        for entry in manifest:
+            if entry.get('filename') and entry.get('file_size'):
+                self.sizes.setdefault(entry['filename'], entry['file_size'])
+
+    def update(self, entries, elapsed, bytes_transferred):
+        for entry in entries:
+            if entry.get('filename') and entry.get('file_size'):
+                self.sizes[entry['filename']] = entry['file_size']
+        # Con pocos datos (casi todo saltado) la medida no es representativa
+        if elapsed > 0 and bytes_transferred >= 1024 * 1024:
+            self.throughput = bytes_transferred / elapsed
+
+    def save(self):
+        write_json(self.path, {'sizes': self.sizes, 'throughput': self.throughput,
+                               'updated': time.time()})
+
+def estimate_size(known_sizes):
+    return int(statistics.median(known_sizes)) if known_sizes else DEFAULT_JAR_SIZE
+
+def minor_version(text):
+    match = MINOR_PATTERN.search(text or '')
+    if not match:
+        return None
+    return int(match.group(1))
+
+def version_guess(minor):
+    nearest = min(VERSION_SIZES_MB, key=lambda known: abs(known - minor))
+    return int(VERSION_SIZES_MB[nearest] * 1024 * 1024)
+
+def estimate_sizes(entries, known_sizes):
+    # Sin tamaño real: mediana de los tamaños conocidos de la misma versión de
+    # Minecraft, luego la tabla por versión y, en último caso, la mediana global
+    by_minor = {}
+    for filename, size in known_sizes.items():
+        minor = minor_version(filename)
+        if minor is not None:
+            by_minor.setdefault(minor, []).append(size)
+    fallback = estimate_size(list(known_sizes.values()))
+    sizes = {}
+    for entry in entries:
+        minor = minor_version(entry.get('minecraft_version')) or minor_version(entry.get('filename'))
+        if minor in by_minor:
+            sizes[entry.get('filename')] = int(statistics.median(by_minor[minor]))
+        elif minor is not None:
+            sizes[entry.get('filename')] = version_guess(minor)
+        else:
+            sizes[entry.get('filename')] = fallback
+    return sizes
+
+def lpt_order(manifest, sizes):
+    # Longest-processing-time first: los archivos grandes empiezan antes y el
+    # final de la ejecución no queda con un único hilo trabajando
+    return sorted(manifest, key=lambda entry: sizes.get(entry.get('filename'), 0), reverse=True)
+
+def check_disk_space(path, needed):
+    free = shutil.disk_usage(path).free
+    return free >= needed * DISK_MARGIN, free
+
+def format_bytes(value):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if value < 1024 or unit == 'GB':
+            return f"{value:.1f} {unit}" if unit != 'B' else f"{int(value)} B"
+        value /= 1024
@@ -0,0 +1,146 @@
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+MODES = ('cpu', 'mem')
+DEFAULT_TOP = 25
+
+_active = None
+
+def record(name, seconds):
+    profile = _active
+    if profile is not None:
+        profile.record(name, seconds)
+
+@contextmanager
+def phase(name):
+    # Sin --profile activo el coste es una comprobación por llamada
+    if _active is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+def peak_rss():
+    # Pico de memoria residente en bytes (este proceso o el mayor de sus hijos)
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+class Profile:
+    def __init__(self, mode, output_dir='.', label='run', top=DEFAULT_TOP):
+        if mode not in MODES:
+            raise ValueError(f"Modo de perfilado desconocido: {mode}")
+        self.mode = mode
+        self.output_dir = output_dir
+        self.label = label
+        self.top = top
+        self.phases = {}
+        self.lock = threading.Lock()
+        self.profilers = []
+        self.files = []
+        self.peak = 0
+        self.elapsed = 0.0
+
+    def record(self, name, seconds):
+        with self.lock:
+            count, total = self.phases.get(name, (0, 0.0))
+            self.phases[name] = (count + 1, total + seconds)
+
+    def _profile_thread(self, frame, event, arg):
+        # cProfile solo ve el hilo que lo activa: cada hilo nuevo arranca el suyo
+        import cProfile
+        sys.setprofile(None)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+: el perfilador del hilo principal ya cubre todos los hilos
+            return
+        with self.lock:
+            self.profilers.append(profiler)
+
+    def start(self):
+        global _active
+        _active = self
+        self.started = time.perf_counter()
+        if self.mode == 'cpu':
+            import cProfile
+            profiler = cProfile.Profile()
+            self.profilers.append(profiler)
+            threading.setprofile(self._profile_thread)
+            profiler.enable()
+        else:
+            import tracemalloc
+            tracemalloc.start(5)
+
+    def stop(self):
+        global _active
+        self.elapsed = time.perf_counter() - self.started
+        _active = None
+        os.makedirs(self.output_dir, exist_ok=True)
+        stem = os.path.join(self.output_dir, f"pyoptifine_{self.label}_{time.strftime('%Y%m%d_%H%M%S')}")
+        if self.mode == 'cpu':
+            report = self._stop_cpu(stem)
+        else:
+            report = self._stop_mem(stem)
+        summary_path = stem + '.txt'
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            f.write(self.phase_report() + '\n' + report)
+        self.files.append(summary_path)
+        return self.phase_report() + '\n' + report
+
+    def _stop_cpu(self, stem):
+        threading.setprofile(None)
+        self.profilers[0].disable()
+        import io
+        import pstats
+        with self.lock:
+            profilers = list(self.profilers)
+        stats = pstats.Stats(profilers[0])
+        for profiler in profilers[1:]:
+            stats.add(profiler)
+        path = stem + '.prof'
+        stats.dump_stats(path)
+        self.files.append(path)
+        out = io.StringIO()
+        stats.stream = out
+        stats.sort_stats('cumulative').print_stats(self.top)
+        return f"Top {self.top} funciones por tiempo acumulado ({len(profilers)} hilos perfilados):\n" + out.getvalue()
+
+    def _stop_mem(self, stem):
+        import tracemalloc
+        snapshot = tracemalloc.take_snapshot()
+        current, self.peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        path = stem + '.tracemalloc'
+        snapshot.dump(path)
+        self.files.append(path)
+        lines = [f"Memoria: actual {current / 1048576:.1f} MB, pico {self.peak / 1048576:.1f} MB",
+                 f"Top {self.top} líneas por memoria retenida:"]
+        for stat in snapshot.statistics('lineno')[:self.top]:
+            frame = stat.traceback[0]
+            lines.append(f"  {stat.size / 1024:10.1f} KB {stat.count:8d} bloques  {frame.filename}:{frame.lineno}")
+        return '\n'.join(lines) + '\n'
+
+    def phase_report(self):
+        lines = [f"Tiempo total: {self.elapsed:.3f} s",
+                 "Fases (segundos sumados entre hilos):"]
+        for name, (count, total) in sorted(self.phases.items(), key=lambda item: -item[1][1]):
+            lines.append(f"  {name:16s} {total:10.3f} s  {count:6d} veces")
+        if not self.phases:
+            lines.append("  (ninguna fase registrada)")
+        return '\n'.join(lines) + '\n'
+
+    def phase_totals(self):
+        return {name: round(total, 3) for name, (_, total) in self.phases.items()}
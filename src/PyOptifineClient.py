@@ -0,0 +1,226 @@
+import asyncio
+import functools
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+import OptifineDownloader
+from OptifineDownloader import DownloadManager, generate_manifest, ensure_directories
+from RateLimiter import RateLimiter
+
+@dataclass
+class ProgressEvent:
+    kind: str
+    message: str = ""
+    current: int = 0
+    total: int = 0
+    data: dict = field(default_factory=dict)
+    timestamp: float = field(default_factory=time.time)
+
+@dataclass
+class DownloadResult:
+    filename: str
+    status: str
+    downloaded: bool = False
+    file_size: int = 0
+    local_path: str = ""
+    sha256: str = ""
+    error: str = ""
+
+@dataclass
+class SyncResult:
+    entries: list
+    results: list
+    stats: dict
+    errors: list
+
+    @property
+    def ok(self):
+        return self.stats.get('failed', 0) == 0
+
+@dataclass
+class PatchResult:
+    optifine_jar: str
+    minecraft_dir: str
+    elapsed: float
+
+class EventConsole:
+    # Sustituye a SilentConsole: no imprime nada, reenvía cada mensaje como evento
+    def __init__(self, emit):
+        self.emit = emit
+        self.errors = []
+
+    def add_message(self, message):
+        self.emit(ProgressEvent('message', message))
+
+    def add_error(self, error):
+        self.errors.append(error)
+        self.emit(ProgressEvent('error', error))
+
+    def progress(self, current, total, prefix="", suffix=""):
+        self.emit(ProgressEvent('progress', prefix, current, total))
+
+    def event(self, kind, **data):
+        self.emit(ProgressEvent(kind, data.get('filename', ''), data=data))
+
+    def print_all_messages(self):
+        pass
+
+class OptifineClient:
+    def __init__(self, manifest_ttl=300, **config):
+        self.config = dict(OptifineDownloader.CONFIG)
+        self._listeners = []
+        self._lock = threading.RLock()
+        self._manifest = None
+        self._manifest_time = 0.0
+        self.manifest_ttl = manifest_ttl
+        self.console = EventConsole(self._emit)
+        self.configure(**config)
+        self.manager = DownloadManager(self.console, self.config)
+
+    def configure(self, **kwargs):
+        with self._lock:
+            changed = set()
+            for key, value in kwargs.items():
+                key = key.upper()
+                if key not in self.config:
+                    raise KeyError(f"Opción de configuración desconocida: {key}")
+                if self.config[key] != value:
+                    self.config[key] = value
+                    changed.add(key)
+            if changed & {'MIN_VERSION', 'DOWNLOAD_PREVIEWS'}:
+                self._manifest = None
+            if changed & {'REQUESTS_PER_SECOND', 'MAX_BYTES_PER_SECOND'} and hasattr(self, 'manager'):
+                self.manager.rate_limiter = RateLimiter(
+                    self.config['REQUESTS_PER_SECOND'],
+                    self.config['MAX_BYTES_PER_SECOND']
+                )
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _emit(self, event):
+        for callback in list(self._listeners):
+            try:
+                callback(event)
+            except Exception:
+                pass
+
+    def scrape(self, refresh=False):
+        with self._lock:
+            fresh = time.monotonic() - self._manifest_time < self.manifest_ttl
+            if self._manifest is not None and fresh and not refresh:
+                return [entry.copy() for entry in self._manifest]
+            manifest = generate_manifest(self.console, self.config, self.manager.opener)
+            if manifest:
+                self._manifest = manifest
+                self._manifest_time = time.monotonic()
+            return [entry.copy() for entry in manifest]
+
+    def find(self, filename):
+        for entry in self.scrape():
+            if entry.get('filename') == filename:
+                return entry
+        raise KeyError(f"Versión no encontrada en optifine.net: {filename}")
+
+    def resolve(self, entry):
+        if isinstance(entry, str):
+            entry = self.find(entry)
+        return self.manager.get_final_url(entry['mirror_url'])
+
+    def download(self, filenames=None, manifest=None):
+        with self._lock:
+            if manifest is None:
+                manifest = self.scrape()
+            if filenames is not None:
+                wanted = set(filenames)
+                manifest = [entry for entry in manifest if entry.get('filename') in wanted]
+
+            ensure_directories(self.config)
+            self.manager.reset()
+            self.console.errors = []
+            entries = self.manager.download_all(manifest) if manifest else []
+
+            details = {d['filename']: d for _, d in self.manager.outcomes()}
+            self.manager.discard_results()
+            results = []
+            for entry in entries:
+                detail = details.get(entry.get('filename'), {})
+                results.append(DownloadResult(
+                    filename=entry.get('filename', ''),
+                    status=detail.get('status', 'failed'),
+                    downloaded=entry.get('downloaded', False),
+                    file_size=entry.get('file_size', 0),
+                    local_path=entry.get('local_path', ''),
+                    sha256=entry.get('sha256', ''),
+                    error=detail.get('error', '')
+                ))
+            self._emit(ProgressEvent('done', "Descarga completada",
+                                     len(results), len(results)))
+            return SyncResult(entries, results, dict(self.manager.stats), list(self.console.errors))
+
+    def ensure_available(self, filename, timeout=None):
+        # Nada aquí toma self._lock: download() lo tiene durante toda la
+        # sincronización y esta petición debe colarse en ella, no esperarla
+        entry = next((item for item in self._manifest or [] if item.get('filename') == filename), None)
+        if entry is None:
+            # download(manifest=...) no pasa por scrape(): la entrada está en su cola
+            entry = self.manager.queue.find(filename)
+        if entry is None:
+            manifest = generate_manifest(self.console, self.config, self.manager.opener)
+            entry = next((item for item in manifest if item.get('filename') == filename), None)
+            if entry is None:
+                raise KeyError(f"Versión no encontrada en optifine.net: {filename}")
+        ensure_directories(self.config)
+        return self.manager.ensure_available(entry, timeout)
+
+    def install(self, filename, minecraft_dir, java_cmd=None, tmp_root=None):
+        start = time.perf_counter()
+        jar_path = self.ensure_available(filename)
+        self._emit(ProgressEvent('message', f"{filename} disponible en {time.perf_counter() - start:.2f}s"))
+        return self.patch(jar_path, minecraft_dir, java_cmd, tmp_root)
+
+    def patch(self, optifine_jar, minecraft_dir, java_cmd=None, tmp_root=None):
+        from OptifineExecuting import execute_optifine
+        from PatchPrecheck import PatchIndex, INDEX_NAME
+
+        start = time.perf_counter()
+        self._emit(ProgressEvent('message', f"Parcheando {optifine_jar}"))
+        on_phase = lambda name, seconds: self.console.event('phase', name=name, seconds=seconds)
+        kwargs = {'on_phase': on_phase, 'tmp_root': tmp_root}
+        if os.path.isdir(self.config['BASE_DIR']):
+            kwargs['patch_index'] = PatchIndex(os.path.join(self.config['BASE_DIR'], INDEX_NAME))
+        if java_cmd:
+            kwargs['java_cmd'] = java_cmd
+        execute_optifine(str(optifine_jar), str(minecraft_dir), **kwargs)
+        result = PatchResult(str(optifine_jar), str(minecraft_dir), time.perf_counter() - start)
+        self._emit(ProgressEvent('done', "Instalación completada"))
+        return result
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+    async def scrape_async(self, refresh=False):
+        return await self._run(self.scrape, refresh)
+
+    async def resolve_async(self, entry):
+        return await self._run(self.resolve, entry)
+
+    async def download_async(self, filenames=None, manifest=None):
+        return await self._run(self.download, filenames, manifest)
+
+    async def ensure_available_async(self, filename, timeout=None):
+        return await self._run(self.ensure_available, filename, timeout)
+
+    async def install_async(self, filename, minecraft_dir, java_cmd=None, tmp_root=None):
+        return await self._run(self.install, filename, minecraft_dir, java_cmd, tmp_root)
+
+    async def patch_async(self, optifine_jar, minecraft_dir, java_cmd=None, tmp_root=None):
+        return await self._run(self.patch, optifine_jar, minecraft_dir, java_cmd, tmp_root)
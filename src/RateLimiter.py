@@ -0,0 +1,83 @@
+import threading
+import time
+import urllib.parse
+
+UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+def parse_rate(value):
+    if value is None:
+        return 0
+    if isinstance(value, (int, float)):
+        return max(0, value)
+    text = str(value).strip().upper()
+    if text.endswith('B'):
+        text = text[:-1]
+    if text.endswith('/S'):
+        text = text[:-2]
+    unit = text[-1:] if text[-1:] in UNITS else ''
+    number = text[:-1] if unit else text
+    try:
+        return max(0, int(float(number) * UNITS[unit]))
+    except ValueError:
+        raise ValueError(f"Valor de velocidad inválido: {value}")
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(self.rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, amount=1):
+        # Se reservan los tokens aunque el saldo quede negativo: cada hilo
+        # espera su turno y la cola de peticiones queda ordenada
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+class RateLimiter:
+    def __init__(self, requests_per_second=0, bytes_per_second=0):
+        self.requests_per_second = float(requests_per_second or 0)
+        self.bytes_per_second = parse_rate(bytes_per_second)
+        self.host_buckets = {}
+        self.byte_bucket = None
+        if self.bytes_per_second > 0:
+            # Ráfaga de al menos 64 KiB para no fragmentar lecturas pequeñas
+            self.byte_bucket = TokenBucket(self.bytes_per_second, max(self.bytes_per_second, 65536))
+        self.lock = threading.Lock()
+        self.waited = 0.0
+
+    @property
+    def enabled(self):
+        return self.requests_per_second > 0 or self.byte_bucket is not None
+
+    def _host_bucket(self, url):
+        host = urllib.parse.urlparse(url).netloc.lower()
+        with self.lock:
+            bucket = self.host_buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.requests_per_second)
+                self.host_buckets[host] = bucket
+            return bucket
+
+    def _record(self, wait):
+        if wait > 0:
+            with self.lock:
+                self.waited += wait
+
+    def wait_request(self, url):
+        if self.requests_per_second <= 0:
+            return
+        self._record(self._host_bucket(url).consume(1))
+
+    def wait_bytes(self, amount):
+        if self.byte_bucket is None or amount <= 0:
+            return
+        self._record(self.byte_bucket.consume(amount))
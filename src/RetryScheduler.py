@@ -0,0 +1,109 @@
+import heapq
+import itertools
+import json
+import os
+import random
+import socket
+import threading
+import time
+import urllib.error
+import http.client
+
+from ManifestStore import write_json
+
+RETRYABLE_HTTP_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+class RetryableError(Exception):
+    pass
+
+class FatalError(Exception):
+    pass
+
+def is_retryable(error):
+    if isinstance(error, RetryableError):
+        return True
+    if isinstance(error, FatalError):
+        return False
+    # HTTPError hereda de URLError: se evalúa primero por código
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code in RETRYABLE_HTTP_CODES
+    if isinstance(error, urllib.error.URLError):
+        return True
+    if isinstance(error, (socket.timeout, TimeoutError, ConnectionError, http.client.HTTPException)):
+        return True
+    return False
+
+def backoff_delay(attempt, base_delay=1.0, max_delay=60.0):
+    # Full jitter: espera aleatoria entre 0 y el tope exponencial
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+class RetryScheduler:
+    def __init__(self, max_retries=3, base_delay=1.0, max_delay=60.0, budget=0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.used = 0
+        self.attempts = {}
+        self._heap = []
+        self._counter = itertools.count()
+        self.lock = threading.Lock()
+        self.ready = threading.Condition(self.lock)
+
+    def attempts_for(self, key):
+        with self.lock:
+            return self.attempts.get(key, 0)
+
+    def schedule(self, key, item):
+        with self.lock:
+            attempt = self.attempts.get(key, 0)
+            if attempt >= self.max_retries:
+                return False
+            if self.budget and self.used >= self.budget:
+                return False
+            self.attempts[key] = attempt + 1
+            self.used += 1
+            due = time.monotonic() + backoff_delay(attempt, self.base_delay, self.max_delay)
+            heapq.heappush(self._heap, (due, next(self._counter), item))
+            self.ready.notify()
+            return True
+
+    def pending(self):
+        with self.lock:
+            return len(self._heap)
+
+    def wait_next(self, deadline=None):
+        with self.lock:
+            while self._heap:
+                due = self._heap[0][0]
+                now = time.monotonic()
+                if due <= now:
+                    return heapq.heappop(self._heap)[2]
+                if deadline is not None and deadline <= now:
+                    return None
+                self.ready.wait(min(due, deadline) - now if deadline is not None else due - now)
+            return None
+
+class FailureQueue:
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, list) else []
+        except (OSError, ValueError):
+            return []
+
+    def save(self, entries):
+        if not entries:
+            self.clear()
+            return
+        write_json(self.path, entries)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,177 @@
+import math
+import multiprocessing
+import queue
+
+from ManifestStore import ManifestJournal
+
+# Claves de stats que suman los procesos; 'changelogs' lo cuenta el proceso principal
+SUMMED_STATS = ('downloaded', 'skipped', 'failed', 'bytes', 'retries')
+
+class QueueConsole:
+    # Consola del proceso hijo: todo se reenvía al principal por la cola
+    def __init__(self, shard, events):
+        self.shard = shard
+        self.events = events
+
+    def add_message(self, message):
+        self.events.put(('message', self.shard, message))
+
+    def add_error(self, error):
+        self.events.put(('error', self.shard, error))
+
+    def progress(self, current, total, prefix="", suffix=""):
+        self.events.put(('progress', self.shard, current))
+
+    def event(self, kind, **data):
+        self.events.put(('event', self.shard, kind, data))
+
+    def print_all_messages(self):
+        pass
+
+def shard_config(config, processes):
+    # Los límites son globales: cada proceso recibe su parte
+    shard = dict(config)
+    shard['DOWNLOAD_CHANGELOGS'] = False
+    shard['FAILURE_QUEUE'] = False
+    shard['MAX_THREADS'] = max(1, math.ceil(config['MAX_THREADS'] / processes))
+    shard['RETRY_BUDGET'] = max(1, math.ceil(config['RETRY_BUDGET'] / processes))
+    if config['REQUESTS_PER_SECOND']:
+        shard['REQUESTS_PER_SECOND'] = config['REQUESTS_PER_SECOND'] / processes
+    if config['MAX_BYTES_PER_SECOND']:
+        shard['MAX_BYTES_PER_SECOND'] = config['MAX_BYTES_PER_SECOND'] / processes
+    return shard
+
+def split_manifest(manifest, processes, sizes=None):
+    # LPT: cada entrada va al proceso con menos bytes asignados
+    shards = [[] for _ in range(processes)]
+    loads = [0] * processes
+    sizes = sizes or {}
+    ordered = sorted(manifest, key=lambda entry: sizes.get(entry.get('filename'), 0), reverse=True)
+    for entry in ordered:
+        target = loads.index(min(loads))
+        shards[target].append(entry)
+        loads[target] += sizes.get(entry.get('filename'), 0) or 1
+    return [shard for shard in shards if shard]
+
+def shard_results_path(manager, shard):
+    return f"{manager.results_path}.{shard}"
+
+def run_shard(shard, entries, config, events, fixtures=None, results_path=None):
+    import HttpFixtures
+    from OptifineDownloader import DownloadManager
+
+    if fixtures:
+        HttpFixtures.configure(**fixtures)
+    manager = DownloadManager(QueueConsole(shard, events), config, results_path)
+    try:
+        manager.download_all(entries)
+    finally:
+        events.put(('result', shard, {
+            'results': manager.results,
+            'details': manager.download_details,
+            'stats': manager.stats,
+        }))
+
+def download_sharded(manager, manifest, processes, sizes=None):
+    # spawn en vez de fork: el proceso principal ya tiene hilos en marcha
+    import HttpFixtures
+
+    context = multiprocessing.get_context('spawn')
+    events = context.Queue()
+    shards = split_manifest(manifest, processes, sizes)
+    config = shard_config(manager.config, len(shards))
+
+    manager.stats['total'] = len(manifest)
+    manager.console.add_message(f"🚀 Iniciando descarga de {len(manifest)} archivos en {len(shards)} procesos...")
+    changelog_threads = manager.start_changelog_stage(manifest)
+
+    workers = []
+    for index, entries in enumerate(shards):
+        process = context.Process(target=run_shard, args=(index, entries, config, events, HttpFixtures.settings(),
+                                                                  shard_results_path(manager, index)), daemon=True)
+        process.start()
+        workers.append(process)
+
+    progress = [0] * len(shards)
+    finished = {}
+    last = -1
+    while len(finished) < len(shards):
+        try:
+            message = events.get(timeout=0.2)
+        except queue.Empty:
+            # Un proceso que muere sin enviar su resultado no debe colgar la descarga
+            for index, process in enumerate(workers):
+                if index not in finished and not process.is_alive() and events.empty():
+                    finished[index] = None
+            continue
+        kind, index = message[0], message[1]
+        if kind == 'progress':
+            progress[index] = message[2]
+        elif kind == 'message':
+            manager.console.add_message(message[2])
+        elif kind == 'error':
+            manager.console.add_error(message[2])
+        elif kind == 'event':
+            manager.emit(message[2], shard=index, **message[3])
+        elif kind == 'result':
+            finished[index] = message[2]
+            progress[index] = len(shards[index])
+        processed = sum(progress)
+        if processed != last:
+            manager.console.progress(processed, len(manifest), prefix="📦 Descargas",
+                                     suffix=f"🧩 {len(shards)} procesos")
+            last = processed
+
+    for process in workers:
+        process.join()
+    for thread in changelog_threads:
+        thread.join()
+    if manager.changelog_archive is not None:
+        try:
+            manager.changelog_archive.flush()
+        except Exception as e:
+            manager.console.add_error(f"Error guardando archivo de changelogs: {str(e)}")
+
+    bounded = manager.result_log is not None
+    by_url = {entry.get('mirror_url'): entry for entry in manifest} if bounded else None
+    for index, result in sorted(finished.items()):
+        log = ManifestJournal(shard_results_path(manager, index)) if bounded else None
+        if result is None:
+            if log is not None:
+                log.remove()
+            exitcode = workers[index].exitcode
+            for entry in shards[index]:
+                manager.record_failure(entry, entry.get('filename', 'unknown.jar'),
+                                       RuntimeError(f"El proceso de descarga {index} terminó inesperadamente ({exitcode})"))
+            continue
+        if log is not None:
+            # Memoria acotada: los resultados del proceso llegan por disco, no por la cola
+            for line in log.replay():
+                entry = by_url.get(line['entry'].get('mirror_url'))
+                if entry is not None:
+                    entry.update(line['entry'])
+                manager.result_log.append(line)
+            log.remove()
+        manager.results.extend(result['results'])
+        manager.download_details.extend(result['details'])
+        for key in SUMMED_STATS:
+            manager.stats[key] += result['stats'][key]
+
+    if bounded:
+        return [entry for entry in manifest if 'downloaded' in entry]
+
+    by_url = {result.get('mirror_url'): result for result in manager.results}
+    final = []
+    for original in manifest:
+        result = by_url.get(original.get('mirror_url'))
+        if result is not None:
+            merged = original.copy()
+            merged.update({
+                'downloaded': result.get('downloaded', False),
+                'file_size': result.get('file_size', 0),
+                'local_path': result.get('local_path', '')
+            })
+            if 'sha256' in result:
+                merged['sha256'] = result['sha256']
+            final.append(merged)
+    return final
@@ -0,0 +1,256 @@
+import gzip
+import hashlib
+import http.server
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import Profiling
+from ManifestStore import write_manifest, write_json
+from OptifineDownloader import (DownloadManager, parse_manifest, ensure_directories,
+                                get_directories, DOWNLOADS_URL)
+
+STATUS_NAME = 'PyOptifine_Watch.json'
+MANIFEST_NAME = 'PyOptifine_Manifest.json'
+DEFAULT_INTERVAL = 600
+
+def fetch_conditional(opener, url, etag=None, last_modified=None, timeout=15):
+    request = urllib.request.Request(url)
+    if etag:
+        request.add_header('If-None-Match', etag)
+    if last_modified:
+        request.add_header('If-Modified-Since', last_modified)
+    try:
+        response = opener.open(request, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return None, etag, last_modified
+        raise
+    body = response.read()
+    if response.headers.get('Content-Encoding') == 'gzip':
+        body = gzip.decompress(body)
+    return body, response.headers.get('ETag'), response.headers.get('Last-Modified')
+
+class WatchConsole:
+    # Un daemon no puede acumular mensajes hasta el final: se imprimen al momento
+    def __init__(self, stream=None):
+        self.stream = stream
+        self.start_time = time.time()
+
+    def write(self, text):
+        print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {text}", file=self.stream, flush=True)
+
+    def add_message(self, message):
+        self.write(message)
+
+    def add_error(self, error):
+        self.write(f"❌ {error}")
+
+    def progress(self, current, total, prefix="", suffix=""):
+        if current == total:
+            self.write(f"{prefix} {current}/{total} {suffix}".strip())
+
+    def print_all_messages(self):
+        pass
+
+class StatusHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/status'):
+            self.send_error(404)
+            return
+        body = json.dumps(self.server.watcher.status_snapshot(), indent=2).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class Watcher:
+    def __init__(self, console, config, interval=DEFAULT_INTERVAL, prepatch=False):
+        self.console = console
+        self.config = config
+        self.interval = interval
+        self.prepatch = prepatch
+        # Un único DownloadManager: opener, cookies y límites sobreviven entre sondeos
+        self.manager = DownloadManager(console, config)
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.etag = None
+        self.last_modified = None
+        self.page_hash = None
+        self.syncing = False
+        ensure_directories(config)
+        base_dir, self.jar_dir, _ = get_directories(config)
+        self.manifest_path = os.path.join(base_dir, MANIFEST_NAME)
+        self.status_path = os.path.join(base_dir, STATUS_NAME)
+        self.known = self.load_known()
+        self.status = {
+            'state': 'starting',
+            'started': time.time(),
+            'polls': 0,
+            'not_modified': 0,
+            'syncs': 0,
+            'last_poll': None,
+            'last_change': None,
+            'last_poll_latency': None,
+            'last_sync_latency': None,
+            'last_delta': 0,
+            'errors': 0,
+            'last_error': '',
+        }
+
+    def load_known(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = []
+        return {entry['filename']: entry for entry in manifest if entry.get('filename')}
+
+    def is_present(self, filename):
+        entry = self.known.get(filename)
+        return entry is not None and os.path.exists(os.path.join(self.jar_dir, filename))
+
+    def is_retired(self, filename):
+        entry = self.known.get(filename)
+        return entry is not None and bool(entry.get('retired'))
+
+    def status_snapshot(self):
+        with self.lock:
+            status = dict(self.status)
+        stats = self.manager.stats
+        processed = stats['downloaded'] + stats['failed'] + stats['skipped']
+        status['queue_depth'] = stats['total'] - processed if self.syncing else 0
+        status['known_entries'] = len(self.known)
+        return status
+
+    def set_status(self, **values):
+        with self.lock:
+            self.status.update(values)
+        self.write_status()
+
+    def write_status(self):
+        try:
+            write_json(self.status_path, self.status_snapshot())
+        except OSError as e:
+            self.console.add_error(f"Error guardando estado del watch: {str(e)}")
+
+    def poll(self):
+        with Profiling.phase('scrape'):
+            body, etag, last_modified = fetch_conditional(
+                self.manager.opener, DOWNLOADS_URL, self.etag, self.last_modified)
+        if body is None:
+            return None
+        self.etag, self.last_modified = etag, last_modified
+        # Sin soporte de peticiones condicionales el hash evita volver a parsear
+        page_hash = hashlib.sha256(body).hexdigest()
+        if page_hash == self.page_hash:
+            return None
+        self.page_hash = page_hash
+        with Profiling.phase('scrape'):
+            manifest = parse_manifest(body.decode('utf-8', errors='ignore'), self.console, self.config)
+        # Se relee el manifiesto: un gc hecho mientras tanto habrá retirado entradas
+        self.known = self.load_known()
+        return [entry for entry in manifest
+                if not self.is_present(entry.get('filename')) and not self.is_retired(entry.get('filename'))]
+
+    def sync(self, delta):
+        ensure_directories(self.config)
+        self.manager.reset()
+        self.syncing = True
+        try:
+            final = self.manager.download_all(delta)
+        finally:
+            self.syncing = False
+        for entry in final:
+            self.known[entry['filename']] = entry
+        if self.manager.stats['failed']:
+            # Olvidar la página fuerza a reintentar los fallos en el siguiente sondeo
+            self.etag = self.last_modified = self.page_hash = None
+        self.save_manifest()
+        if self.prepatch:
+            self.prepatch_entries(final)
+        return final
+
+    def save_manifest(self):
+        write_manifest(self.manifest_path, self.known.values())
+
+    def prepatch_entries(self, entries):
+        import OptifinePatcher
+        from PatchPrecheck import PatchIndex, INDEX_NAME
+
+        base_dir, _, _ = get_directories(self.config)
+        patched_dir = os.path.join(base_dir, 'Patched')
+        os.makedirs(patched_dir, exist_ok=True)
+        cfr_jar = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'libraries', 'cfr-0.152.jar')
+        index = PatchIndex(os.path.join(base_dir, INDEX_NAME))
+        for entry in entries:
+            jar_path = entry.get('local_path')
+            if not jar_path or not os.path.exists(jar_path):
+                continue
+            if not index.check(jar_path, entry.get('sha256'))['patchable']:
+                continue
+            output = os.path.join(patched_dir, entry['filename'][:-4] + '_PATCHED.jar')
+            try:
+                OptifinePatcher.patch_optifine_installer(jar_path, output, cfr_jar, main_class="optifine.Installer")
+                self.manager.emit('prepatched', filename=entry['filename'], path=output)
+            except OptifinePatcher.UnpatchableInstaller as e:
+                index.mark_failed(jar_path)
+                self.console.add_error(f"Pre-parcheo de {entry['filename']}: {str(e)}")
+            except Exception as e:
+                self.console.add_error(f"Pre-parcheo de {entry['filename']}: {str(e)}")
+        index.save()
+
+    def run_once(self):
+        start = time.perf_counter()
+        self.set_status(state='polling')
+        with self.lock:
+            self.status['polls'] += 1
+        try:
+            delta = self.poll()
+            if delta is None:
+                with self.lock:
+                    self.status['not_modified'] += 1
+                    self.status['last_delta'] = 0
+            elif delta:
+                self.console.add_message(f"🆕 {len(delta)} versiones nuevas")
+                self.set_status(state='syncing', last_delta=len(delta), last_change=time.time())
+                self.sync(delta)
+                # Desde que empezó el sondeo que vio el cambio hasta tener los .jar
+                with self.lock:
+                    self.status['syncs'] += 1
+                    self.status['last_sync_latency'] = round(time.perf_counter() - start, 3)
+            else:
+                self.set_status(last_delta=0)
+        except Exception as e:
+            self.console.add_error(f"Error en el sondeo: {str(e)}")
+            with self.lock:
+                self.status['errors'] += 1
+                self.status['last_error'] = str(e)
+        latency = time.perf_counter() - start
+        self.set_status(state='idle', last_poll=time.time(), last_poll_latency=round(latency, 3))
+        self.manager.emit('poll', latency=round(latency, 3), delta=self.status['last_delta'])
+        return latency
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.run_once()
+            self.stop_event.wait(self.interval)
+        self.set_status(state='stopped')
+
+    def stop(self):
+        self.stop_event.set()
+
+def serve_status(watcher, host='127.0.0.1', port=8081):
+    server = http.server.ThreadingHTTPServer((host, port), StatusHandler)
+    server.daemon_threads = True
+    server.watcher = watcher
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server